@@ -0,0 +1,123 @@
+# Layout, painting and undo/redo on a live canvas, headless.
+#
+#   python benchmarks/bench_canvas.py [--sizes 100 1000 10000] [--renderer widgets|batched] [--json]
+#
+# "build" is turning a freshly loaded board into dots, "layout_all" the
+# board-wide label solve, "drag_step" one mouse move of a drag (the dot's
+# update_position plus the neighbours it pushes), "links_cold"/"links_warm"
+# draw_dependencies with and without building the link geometry, "paint" a
+# full render of the canvas, "undo"/"redo" one move each.
+
+import os
+import tempfile
+
+# before Qt and config are imported: no window system, and a throwaway
+# storage dir so history.log and tasks.json never touch the real ones
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+os.environ["XDG_CONFIG_HOME"] = tempfile.mkdtemp(prefix="eisquads-bench-")
+
+import argparse
+import json
+import random
+
+from boards import make_board, timed, add_board_args, print_table
+from PyQt6.QtCore import QRectF
+from PyQt6.QtGui import QImage, QPainter
+from PyQt6.QtWidgets import QApplication
+from config import RenderConfig
+
+CANVAS_W, CANVAS_H = 1200, 800
+
+def new_canvas(app, renderer):
+    from matrix import MatrixCanvas
+    RenderConfig.RENDERER = renderer
+    canvas = MatrixCanvas()
+    canvas.resize(CANVAS_W, CANVAS_H)
+    canvas.show()
+    canvas.wait_for_io() # the (empty) initial load
+    app.processEvents()
+    return canvas
+
+def clear_board(canvas):
+    canvas.tasks = []
+    canvas.refresh_dots()
+    canvas.dot_pool.clear()
+
+def bench_size(app, n, repeat, renderer, **board):
+    results = {}
+    canvas = new_canvas(app, renderer)
+    build_repeat = max(1, min(repeat, repeat * 100 // n)) # whole-board cases get slow on big boards
+
+    def build():
+        canvas.tasks = make_board(n, **board)
+        canvas.refresh_dots()
+    results['build'] = timed(build, build_repeat, setup=lambda: clear_board(canvas))
+    app.processEvents()
+
+    results['layout_all'] = timed(canvas.layout_all, build_repeat)
+
+    rng = random.Random(1)
+    def drag_step():
+        dot = rng.choice(canvas.dots)
+        dot.task.x = min(1.0, max(0.0, dot.task.x + rng.uniform(-0.01, 0.01)))
+        dot.task.y = min(1.0, max(0.0, dot.task.y + rng.uniform(-0.01, 0.01)))
+        dot.update_position()
+        canvas.relayout_dirty(skip=dot)
+        canvas.flush_edge_damage()
+    results['drag_step'] = timed(drag_step, repeat * 5)
+
+    image = QImage(CANVAS_W, CANVAS_H, QImage.Format.Format_ARGB32_Premultiplied)
+    def draw_links():
+        painter = QPainter(image)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        canvas.draw_dependencies(painter, QRectF(0, 0, CANVAS_W, CANVAS_H))
+        painter.end()
+    results['links_cold'] = timed(draw_links, repeat, setup=canvas.edge_cache.clear)
+    results['links_warm'] = timed(draw_links, repeat)
+
+    def paint():
+        painter = QPainter(image)
+        canvas.render(painter)
+        painter.end()
+    results['paint'] = timed(paint, build_repeat)
+
+    # a run of moves of different tasks, so nothing merges in the history
+    moved = rng.sample(canvas.dots, min(repeat, len(canvas.dots)))
+    for dot in moved:
+        before = [dot.task.x, dot.task.y]
+        dot.task.x, dot.task.y = rng.random(), rng.random()
+        dot.update_position()
+        canvas.push_undo('move', [{'op': 'move', 'id': dot.task.id, 'before': before,
+                                   'after': [dot.task.x, dot.task.y]}])
+    results['undo'] = timed(canvas.undo, len(moved))
+    results['redo'] = timed(canvas.redo, len(moved))
+
+    canvas.discard_pending_save()
+    canvas.history.clear()
+    canvas.hide()
+    canvas.deleteLater()
+    app.processEvents()
+    return results
+
+_app = None # kept alive across runs, Qt crashes if it goes away under live widgets
+
+def run(sizes, repeat, renderer='widgets', **board):
+    global _app
+    app = _app = QApplication.instance() or QApplication([])
+    return {n: bench_size(app, n, repeat, renderer, **board) for n in sizes}
+
+def main():
+    parser = argparse.ArgumentParser()
+    add_board_args(parser)
+    parser.add_argument('--renderer', choices=['widgets', 'batched'], default=RenderConfig.RENDERER)
+    args = parser.parse_args()
+
+    report = run(args.sizes, args.repeat, args.renderer,
+                 edge_density=args.edge_density, title_words=tuple(args.title_words))
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print_table(report)
+
+if __name__ == '__main__':
+    main()
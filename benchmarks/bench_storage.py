@@ -0,0 +1,78 @@
+# Save and load latency of the storage backends for boards of different sizes.
+#
+#   python benchmarks/bench_storage.py [--sizes 100 1000 10000] [--repeat 20] [--json]
+#
+# "full" is what the json backend does on every save (rewrite the board),
+# "move" is a single dragged task written through the record path,
+# "load" is TaskManager.load_tasks on that backend, pruning included.
+
+import argparse
+import json
+import random
+import tempfile
+from pathlib import Path
+
+from boards import make_board, timed, add_board_args, print_table
+from models import TaskManager
+from storage import JsonStore, JournalStore, SqliteStore, build_records
+
+def load_with(store):
+    def load():
+        TaskManager._store = store
+        try:
+            return TaskManager.load_tasks()
+        finally:
+            TaskManager._store = None
+    return load
+
+def bench_size(n, repeat, workdir, **board):
+    tasks = make_board(n, **board)
+    dicts = [t.to_dict() for t in tasks]
+    rng = random.Random(1)
+
+    def move_records():
+        t = rng.choice(tasks)
+        t.x = rng.random()
+        return build_records(tasks, [('move', t.id)])
+
+    results = {}
+    json_store = JsonStore(workdir / f"json-{n}" / "tasks.json")
+    json_store.path.parent.mkdir()
+    results['json_full'] = timed(lambda: json_store.write_snapshot([t.to_dict() for t in tasks]), repeat)
+    results['json_load'] = timed(load_with(json_store), repeat)
+
+    journal = JournalStore(workdir / f"journal-{n}" / "tasks.json", compact_bytes=1 << 30)
+    journal.path.parent.mkdir()
+    journal.write_snapshot(dicts)
+    results['journal_move'] = timed(lambda: journal.append(move_records()), repeat)
+    # loading replays the journal and writes a clean snapshot, so only the first load replays
+    results['journal_load'] = timed(load_with(journal), repeat)
+
+    (workdir / f"sqlite-{n}").mkdir()
+    sqlite = SqliteStore(workdir / f"sqlite-{n}" / "tasks.json")
+    results['sqlite_full'] = timed(lambda: sqlite.write_snapshot(dicts), max(1, repeat // 4))
+    results['sqlite_move'] = timed(lambda: sqlite.append(move_records()), repeat)
+    results['sqlite_load'] = timed(load_with(sqlite), repeat)
+    sqlite.conn.close()
+    return results
+
+def run(sizes, repeat, **board):
+    report = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            report[n] = bench_size(n, repeat, Path(tmp), **board)
+    return report
+
+def main():
+    parser = argparse.ArgumentParser()
+    add_board_args(parser)
+    args = parser.parse_args()
+
+    report = run(args.sizes, args.repeat, edge_density=args.edge_density, title_words=tuple(args.title_words))
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print_table(report)
+
+if __name__ == '__main__':
+    main()
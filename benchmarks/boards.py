@@ -0,0 +1,61 @@
+# Shared helpers for the benchmarks: synthetic boards and a timer.
+
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src" / "eisquads"))
+
+from models import Task
+
+WORDS = ["plan", "review", "fix", "call", "write", "ship", "budget", "draft", "team", "report",
+         "design", "release", "notes", "meeting", "invoice", "backlog", "cleanup", "docs"]
+
+def make_board(n, edge_density=0.2, title_words=(1, 4), seed=0):
+    # edge_density is links per task; links only point at earlier tasks, so
+    # the board never has a cycle (the canvas refuses to make one either)
+    rng = random.Random(seed)
+    tasks = []
+    for i in range(n):
+        title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(*title_words)))
+        tasks.append(Task(f"task-{i}", title, "", rng.random(), rng.random()))
+    for _ in range(int(n * edge_density)):
+        if n < 2:
+            break
+        a = rng.randrange(1, n)
+        dep = tasks[rng.randrange(a)].id
+        if dep not in tasks[a].dependencies:
+            tasks[a].dependencies.append(dep)
+    return tasks
+
+def timed(fn, repeat, setup=None):
+    # setup runs before every sample and is not timed
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        'median_ms': statistics.median(samples),
+        'p95_ms': samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        'max_ms': samples[-1],
+        'runs': len(samples),
+    }
+
+def add_board_args(parser):
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--edge-density', type=float, default=0.2, help="links per task")
+    parser.add_argument('--title-words', type=int, nargs=2, default=[1, 4], metavar=('MIN', 'MAX'))
+    parser.add_argument('--json', action='store_true', help="print machine-readable results")
+
+def print_table(report):
+    cases = list(next(iter(report.values())).keys())
+    print(f"{'tasks':>7}  " + "  ".join(f"{c:>14}" for c in cases) + "   (median ms)")
+    for n, res in report.items():
+        print(f"{n:>7}  " + "  ".join(f"{res[c]['median_ms']:>14.3f}" for c in cases))
@@ -0,0 +1,91 @@
+# Runs every benchmark and writes one json file, to compare commits.
+#
+#   python benchmarks/run.py --out before.json
+#   git checkout my-branch
+#   python benchmarks/run.py --out after.json --compare before.json
+#
+# Board options (--sizes, --edge-density, --title-words, --repeat) are the
+# same as for the single benchmarks and are stored with the results; only
+# runs made with the same options are worth comparing.
+
+import os
+import tempfile
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+os.environ["XDG_CONFIG_HOME"] = tempfile.mkdtemp(prefix="eisquads-bench-")
+
+import argparse
+import json
+import platform
+import subprocess
+from pathlib import Path
+
+from boards import add_board_args
+import bench_canvas
+import bench_storage
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=Path(__file__).resolve().parent)
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+def compare(base, new, threshold):
+    # median ratio per case, new / base; flags anything past the threshold
+    print(f"{'benchmark':<28} {'tasks':>6} {'base ms':>10} {'new ms':>10} {'ratio':>7}")
+    for bench, sizes in new['results'].items():
+        for n, cases in sizes.items():
+            for case, stats in cases.items():
+                old = base['results'].get(bench, {}).get(n, {}).get(case)
+                if old is None:
+                    continue
+                ratio = stats['median_ms'] / old['median_ms'] if old['median_ms'] else float('inf')
+                flag = "  slower" if ratio > 1 + threshold else "  faster" if ratio < 1 - threshold else ""
+                print(f"{bench + '.' + case:<28} {n:>6} {old['median_ms']:>10.3f} {stats['median_ms']:>10.3f} {ratio:>7.2f}{flag}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    add_board_args(parser)
+    parser.add_argument('--out', type=Path, help="write the results here")
+    parser.add_argument('--compare', type=Path, help="results of an earlier run to compare against")
+    parser.add_argument('--threshold', type=float, default=0.1, help="ratio change worth flagging")
+    parser.add_argument('--only', nargs='+', choices=['storage', 'widgets', 'batched'],
+                        default=['storage', 'widgets', 'batched'])
+    args = parser.parse_args()
+
+    board = {'edge_density': args.edge_density, 'title_words': tuple(args.title_words)}
+    results = {}
+    if 'storage' in args.only:
+        results['storage'] = bench_storage.run(args.sizes, args.repeat, **board)
+    for renderer in ('widgets', 'batched'):
+        if renderer in args.only:
+            results[f'canvas_{renderer}'] = bench_canvas.run(args.sizes, args.repeat, renderer, **board)
+
+    from PyQt6.QtCore import QT_VERSION_STR
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'qt': QT_VERSION_STR,
+            'platform': platform.platform(),
+            'sizes': args.sizes,
+            'repeat': args.repeat,
+            'edge_density': args.edge_density,
+            'title_words': args.title_words,
+        },
+        # sizes become strings anyway once written, keep them that way for --compare
+        'results': {bench: {str(n): cases for n, cases in sizes.items()} for bench, sizes in results.items()},
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        args.out.write_text(text)
+    elif not args.compare:
+        print(text)
+    if args.compare:
+        compare(json.loads(args.compare.read_text()), report, args.threshold)
+
+if __name__ == '__main__':
+    main()
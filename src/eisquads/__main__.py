@@ -1,13 +1,24 @@
 import sys
+from startup import mark, profile_imports, watch_first_paint
+profile_imports() # before anything heavy is imported, no-op unless profiling
 from PyQt6.QtCore import Qt
 from PyQt6.QtWidgets import QApplication
 from window import SlideWindow
+from config import PerfConfig
+from tracing import tracer
+mark("imports done")
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
+    watch_first_paint(app)
+    if PerfConfig.TRACE:
+        tracer.start() # before the window, so the first load is in the trace
     if hasattr(Qt.ApplicationAttribute, "AA_EnableHighDpiScaling"):
         QApplication.setAttribute(Qt.ApplicationAttribute.AA_EnableHighDpiScaling, True)
         
     window = SlideWindow()
+    mark("window built")
+    app.aboutToQuit.connect(tracer.stop) # after the canvas' own hook, which waits for the last save
     window.show()
+    mark("tab shown")
     sys.exit(app.exec())
\ No newline at end of file
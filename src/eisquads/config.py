@@ -39,6 +39,50 @@ class UiConfig:
     DOT_SIZE = 14
     DOT_FONT = "Segoe UI"
     DOT_FONT_SIZE = 8
+    BG_SETTLE_MS = 150  # background is re-rendered in full quality once panning/zooming pauses this long
+
+@dataclass
+class RenderConfig:
+    # "widgets" makes every task its own QWidget, "batched" has the canvas
+    # paint and hit-test all tasks itself, for boards with thousands of them
+    RENDERER = os.getenv("EISQUADS_RENDERER", "widgets")
+    # drags and link drags are processed once per display frame, not per mouse event
+    FRAME_PACING = os.getenv("EISQUADS_FRAME_PACING", "1") != "0"
+    # labels pushed around by an edit are re-placed for this long per pass,
+    # a crowded board settles the rest over the following idle passes
+    RELAYOUT_SLICE_MS = 8
+
+@dataclass
+class PerfConfig:
+    SAMPLES = 240        # the HUD's percentiles are over this many latest samples
+    HUD_REFRESH_MS = 500
+    # record a Chrome trace of the session (also the "trace" command), see tracing.py
+    TRACE = os.getenv("EISQUADS_TRACE", "") == "1"
+    TRACE_FLUSH_EVENTS = 2000
+
+@dataclass
+class StartupConfig:
+    # fast start: show the tab right away, build the board and decode the
+    # background on an idle timer or at the first expand, whichever is first
+    FAST_START = os.getenv("EISQUADS_FAST_START", "") == "1"
+    IDLE_BUILD_MS = 200
+    LOG = os.getenv("EISQUADS_STARTUP_LOG", "") == "1" # print startup milestones to stderr
+    # time every module imported before the first paint, reported to stderr
+    # and startup_profile.txt in the storage dir (the packaged exe has no console)
+    PROFILE = os.getenv("EISQUADS_STARTUP_PROFILE", "") == "1"
+
+@dataclass
+class StorageConfig:
+    SAVE_DEBOUNCE_MS = 500  # idle time before a burst of edits is written out
+    # "json" rewrites tasks.json on every save, "journal" appends change records,
+    # "sqlite" keeps tasks.db and updates only the rows that changed
+    BACKEND = os.getenv("EISQUADS_STORAGE", "json")
+    JOURNAL_COMPACT_BYTES = 256 * 1024  # fold the journal into a snapshot past this size
+
+@dataclass
+class HistoryConfig:
+    BUDGET_BYTES = 1024 * 1024  # undo + redo entries kept in memory, oldest dropped first
+    LOG_MAX_BYTES = 4 * 1024 * 1024  # history.log is cut to its newest half past this size
 
 STYLESHEET = f"""
 QWidget {{
@@ -85,6 +129,15 @@ font-size: 14px;
 
 DETAIL_POPUP_STYLESHEET = f"background-color: {UiConfig.BG_COLOR}; border: 1px solid {UiConfig.ACCENT_COLOR}; border-radius: 8px;"
 
+NOTICE_STYLESHEET = f"""
+background-color: {UiConfig.BG_COLOR};
+color: {UiConfig.TEXT_COLOR};
+border: 1px solid {UiConfig.DOT_COLOR};
+border-radius: 6px;
+padding: 4px 6px;
+font-size: 11px;
+"""
+
 DRAG_TAB_STYLESHEET = f"""
 QFrame {{
     background-color: {UiConfig.TAB_COLOR};
@@ -1,9 +1,10 @@
 from PyQt6.QtCore import Qt, pyqtSignal, QPoint
-from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLineEdit, 
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLineEdit, QLabel,
                              QTextEdit, QPushButton, QFrame, QGraphicsDropShadowEffect)
 from PyQt6.QtGui import QColor
-from config import INPUT_STYLESHEET, DETAIL_POPUP_STYLESHEET
+from config import INPUT_STYLESHEET, DETAIL_POPUP_STYLESHEET, NOTICE_STYLESHEET
 from models import Task
+from textcache import label_cache
 
 class NameInput(QDialog):
     def __init__(self, parent=None):
@@ -77,6 +78,8 @@ class DetailPopup(QDialog):
         self.setFixedSize(220, 160)
 
     def save(self):
+        # cached measurements of the old title are useless now
+        label_cache.invalidate(self.task.title)
         self.task.title = self.title_edit.text()
         self.task.desc = self.desc_edit.toPlainText()
         self.data_changed.emit(self.task, False)
@@ -85,3 +88,44 @@ class DetailPopup(QDialog):
     def delete(self):
         self.data_changed.emit(self.task, True)
         self.close()
+
+class Notice(QLabel):
+    # A message over the bottom of the canvas, for file errors the user has to
+    # know about (the packaged exe has no console). Click it to dismiss.
+    MAX_LINES = 4
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.setWordWrap(True)
+        self.setStyleSheet(NOTICE_STYLESHEET)
+        self.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.kind = None # what the shown message is about, e.g. 'save' or 'load'
+        self.hide()
+
+    def show_message(self, kind, text):
+        lines = text.splitlines()
+        if len(lines) > self.MAX_LINES:
+            lines = lines[:self.MAX_LINES - 1] + [f"({len(lines) - self.MAX_LINES + 1} more)"]
+        self.kind = kind
+        self.setText("\n".join(lines))
+        self.place()
+        self.show()
+        self.raise_()
+
+    def clear(self, kind):
+        # hide it once whatever it reported is fixed, e.g. a save went through
+        if self.kind == kind:
+            self.kind = None
+            self.hide()
+
+    def place(self):
+        parent = self.parentWidget()
+        width = max(1, parent.width() - 12)
+        self.setFixedWidth(width)
+        height = self.heightForWidth(width)
+        self.setFixedHeight(height)
+        self.move(6, parent.height() - height - 6)
+
+    def mousePressEvent(self, event):
+        self.kind = None
+        self.hide()
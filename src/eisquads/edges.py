@@ -0,0 +1,160 @@
+import math
+from PyQt6.QtCore import QPointF
+from PyQt6.QtGui import QPainterPath, QPainterPathStroker
+from config import UiConfig
+from spatial import GridIndex
+
+HIT_WIDTH = 10 # double-click tolerance around a link, in px
+ARROW_LEN = 10
+ARROW_ANGLE = math.pi / 6
+
+def arrow_path(start, end):
+    # quadratic curve leaving start horizontally
+    start = QPointF(start)
+    end = QPointF(end)
+    path = QPainterPath()
+    path.moveTo(start)
+
+    dx = end.x() - start.x()
+
+    # control point for curve
+    ctrl = QPointF(start.x() + dx * 0.5, start.y())
+    path.quadTo(ctrl, end)
+    return path
+
+class EdgeGeometry:
+    # Everything needed to draw or hit-test one link, built once per endpoint move.
+    def __init__(self, start, end):
+        self.start = QPointF(start)
+        self.end = QPointF(end)
+        self.path, self.head = self._build(self.start, self.end)
+        self._hit = None
+        self._bounds = None
+
+    @staticmethod
+    def _build(start, end):
+        # Adjust start/end to stop at dot edge
+        start = QPointF(start)
+        end = QPointF(end)
+
+        offset = UiConfig.DOT_SIZE / 2
+
+        dx = end.x() - start.x()
+        dy = end.y() - start.y()
+
+        # Adjust start (horizontal tangent)
+        if abs(dx) > 1:
+            start.setX(start.x() + (offset if dx > 0 else -offset))
+
+        # Adjust end (tangent is end - ctrl)
+        # ctrl is (start.x + dx/2, start.y) -> tangent vector is (dx/2, dy)
+        t_vec = QPointF(dx * 0.5, dy)
+        t_len = math.sqrt(t_vec.x()**2 + t_vec.y()**2)
+
+        if t_len > 0:
+            end = end - t_vec * (offset / t_len)
+
+        path = arrow_path(start, end)
+
+        # arrowhead
+        # derivative of quad bezier at t=1 is 2(P2 - P1) where P1 is ctrl, P2 is end
+        dx = end.x() - start.x()
+        ctrl = QPointF(start.x() + dx * 0.5, start.y())
+        angle = math.atan2(end.y() - ctrl.y(), end.x() - ctrl.x())
+
+        p1 = QPointF(end.x() - ARROW_LEN * math.cos(angle - ARROW_ANGLE),
+                     end.y() - ARROW_LEN * math.sin(angle - ARROW_ANGLE))
+        p2 = QPointF(end.x() - ARROW_LEN * math.cos(angle + ARROW_ANGLE),
+                     end.y() - ARROW_LEN * math.sin(angle + ARROW_ANGLE))
+
+        head = QPainterPath()
+        head.moveTo(end)
+        head.lineTo(p1)
+        head.lineTo(p2)
+        head.closeSubpath()
+        return path, head
+
+    @property
+    def hit_outline(self):
+        # stroked lazily, most links are never clicked
+        if self._hit is None:
+            stroker = QPainterPathStroker()
+            stroker.setWidth(HIT_WIDTH)
+            self._hit = stroker.createStroke(arrow_path(self.start, self.end))
+        return self._hit
+
+    def hit_bounds(self):
+        # cheap superset of the hit outline: control points plus the tolerance
+        r = HIT_WIDTH / 2 + 1
+        return arrow_path(self.start, self.end).controlPointRect().adjusted(-r, -r, r, r)
+
+    def bounds(self):
+        # everything this link paints, with room for the pen
+        if self._bounds is None:
+            self._bounds = self.path.boundingRect().united(self.head.boundingRect()).adjusted(-2, -2, 2, 2)
+        return self._bounds
+
+class EdgeGeometryCache:
+    # (from_id, to_id) -> EdgeGeometry. An entry only goes stale when one of
+    # its endpoint dots moves or the link itself is removed.
+    # Built entries are also binned by hit bounds so a click only tests the
+    # few links around it. Links known to exist but not built yet sit in
+    # `stale`; `complete` says every link on the board was built at least once.
+    def __init__(self):
+        self.entries = {}
+        self.by_task = {}
+        self.index = GridIndex()
+        self.stale = set()
+        self.complete = False
+        self.builds = 0
+
+    def get(self, key, start, end):
+        geo = self.entries.get(key)
+        if geo is None:
+            geo = EdgeGeometry(start, end)
+            self.entries[key] = geo
+            for task_id in key:
+                self.by_task.setdefault(task_id, set()).add(key)
+            self.index.insert(key, geo.hit_bounds())
+            self.stale.discard(key)
+            self.builds += 1
+        return geo
+
+    def mark_new(self, key):
+        # a link was just added, build it before the next hit test
+        self.stale.add(key)
+
+    def candidates_at(self, point):
+        return self.index.query_point(point.x(), point.y())
+
+    def peek(self, key):
+        return self.entries.get(key)
+
+    def invalidate_edge(self, key):
+        geo = self.entries.pop(key, None)
+        self.index.remove(key)
+        self.stale.discard(key)
+        for task_id in key:
+            keys = self.by_task.get(task_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.by_task[task_id]
+        return geo
+
+    def invalidate_task(self, task_id):
+        # returns (key, dropped geometry) so callers can repaint where they were
+        dropped = []
+        for key in list(self.by_task.get(task_id, ())):
+            geo = self.invalidate_edge(key)
+            if geo is not None:
+                dropped.append((key, geo))
+            self.stale.add(key) # the link itself still exists
+        return dropped
+
+    def clear(self):
+        self.entries.clear()
+        self.by_task.clear()
+        self.index.clear()
+        self.stale.clear()
+        self.complete = False
@@ -0,0 +1,248 @@
+import json
+import os
+from collections import deque
+
+# An undo entry is {'action': name, 'patches': [...]}, where each patch holds
+# only what one edit changed, as plain json-able data:
+#   {'op': 'move', 'id', 'before': [x, y], 'after': [x, y]}
+#   {'op': 'complete', 'id', 'before': bool, 'after': bool}
+#   {'op': 'edit', 'id', 'before': [title, desc], 'after': [title, desc]}
+#   {'op': 'link' | 'unlink', 'id', 'dep'}
+#   {'op': 'add' | 'delete', 'task': task dict, 'index': int, 'refs': [ids depending on it]}
+#   {'op': 'replace', 'before': [task dicts], 'after': [task dicts]}  (clear / reload)
+
+_INVERSE_OPS = {'link': 'unlink', 'unlink': 'link', 'add': 'delete', 'delete': 'add'}
+
+def invert(patch):
+    op = patch['op']
+    if op in _INVERSE_OPS:
+        return dict(patch, op=_INVERSE_OPS[op])
+    return dict(patch, before=patch['after'], after=patch['before'])
+
+def entry_size(entry):
+    # what the entry costs to keep, close enough for a budget
+    return len(json.dumps(entry, separators=(',', ':')))
+
+class HistoryLog:
+    # The undo stack on disk: one json line per entry, oldest first. New
+    # entries are appended; undoing one cuts it off the tail, so the file is
+    # always the stack, and a restart only needs to read the tail back.
+    # Nothing is read at startup, the size comes from a stat.
+    # With an IoWorker the writes run on its thread, in order with the task
+    # saves. The GUI thread only tracks `end`, where the next entry goes:
+    # offsets count from the start of the file as this session found it and
+    # keep their meaning when the worker prunes the front away.
+    def __init__(self, path, max_bytes, io=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.io = io
+        self.size = path.stat().st_size if path.exists() else 0 # on disk, kept by the writes
+        self.end = self.size
+        self.base = 0 # offset of the first byte still on disk, moved by pruning
+        # what earlier sessions left is the file up to session_start, followed
+        # by the bytes this session cut off past it (undoing into their entries)
+        self.session_start = self.size
+        self.earlier_tail = b""
+
+    def _write(self, fn, *args):
+        if self.io is None:
+            fn(*args)
+        else:
+            self.io.write_history(lambda: fn(*args))
+
+    def append(self, entry):
+        # returns the offset the entry starts at
+        offset = self.end
+        line = (json.dumps(entry, separators=(',', ':')) + "\n").encode('utf-8')
+        self.end += len(line)
+        self._write(self._append_line, line)
+        return offset
+
+    def truncate(self, offset):
+        offset = max(0, min(offset, self.end))
+        if offset == self.end:
+            return
+        self.end = offset
+        self._write(self._cut, offset)
+
+    def pop_tail(self):
+        # read the newest entry from the end of the file and cut it off.
+        # A torn line from a crash is dropped and the one before it tried.
+        # Only reached once this session's entries are used up, so waiting for
+        # the queued writes is rare; with the worker idle the file is ours
+        if self.io is not None:
+            self.io.wait()
+        while self.size > 0:
+            start = self._last_line_start()
+            with open(self.path, 'rb') as f:
+                f.seek(start)
+                raw = f.read(self.size - start)
+            self.end = self.base + start
+            self._truncate(start)
+            try:
+                return json.loads(raw)
+            except ValueError:
+                continue
+        return None
+
+    def rollback_session(self):
+        # put the log back as this session found it, e.g. when its edits are thrown away
+        self._write(self._rollback, self.end)
+
+    # the rest runs on the worker thread, in submission order
+
+    def _append_line(self, line):
+        with open(self.path, 'ab') as f:
+            f.write(line)
+        self.size += len(line)
+        if self.size > self.max_bytes:
+            self._prune()
+
+    def _cut(self, offset):
+        # an offset the worker pruned away takes everything after it along
+        at = max(0, offset - self.base)
+        self.base = min(self.base, offset)
+        self._truncate(at)
+
+    def _truncate(self, at):
+        if at >= self.size:
+            return
+        with open(self.path, 'r+b') as f:
+            if at < self.session_start:
+                # kept so rollback_session can put earlier sessions' entries back
+                f.seek(at)
+                self.earlier_tail = f.read(self.session_start - at) + self.earlier_tail
+                self.session_start = at
+            f.truncate(at)
+        self.size = at
+
+    def _last_line_start(self, chunk=4096):
+        end = self.size - 1 # skip the newline that ends the last entry
+        with open(self.path, 'rb') as f:
+            pos = end
+            while pos > 0:
+                step = min(chunk, pos)
+                f.seek(pos - step)
+                data = f.read(step)
+                nl = data.rfind(b"\n")
+                if nl != -1:
+                    return pos - step + nl + 1
+                pos -= step
+        return 0
+
+    def _prune(self):
+        # keep roughly the newest half once over the cap
+        with open(self.path, 'rb') as f:
+            f.seek(self.size - self.max_bytes // 2)
+            f.readline() # finish the partial line
+            cut = f.tell()
+            rest = f.read()
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, 'wb') as f:
+            f.write(rest)
+        os.replace(tmp, self.path)
+        self.size = len(rest)
+        self.session_start = max(0, self.session_start - cut)
+        self.base += cut
+
+    def _rollback(self, end):
+        if self.size > self.session_start:
+            self._truncate(self.session_start)
+        if self.earlier_tail:
+            with open(self.path, 'ab') as f:
+                f.write(self.earlier_tail)
+            self.size += len(self.earlier_tail)
+            self.session_start = self.size
+            self.earlier_tail = b""
+        self.base = end - self.size # the GUI thread carries on from `end`
+
+class History:
+    # Undo/redo stacks of patch entries, capped by an approximate byte budget
+    # instead of an entry count. The oldest undo entries go first; the newest
+    # one is always kept, however large.
+    # With a log, the undo stack is also kept on disk; entries dropped from
+    # memory (or left by an earlier session) are read back from it on demand.
+    def __init__(self, budget_bytes, log=None):
+        self.budget_bytes = budget_bytes
+        self.log = log
+        self.undo_stack = deque()   # [entry, size, offset in the log]
+        self.redo_stack = []        # [entry, size]
+        self.undo_bytes = 0
+        self.redo_bytes = 0
+
+    def _log_append(self, entry):
+        return None if self.log is None else self.log.append(entry)
+
+    def push(self, action, patches):
+        if not patches:
+            return
+        top = self.undo_stack[-1] if self.undo_stack else None
+        if (action == 'move' and top is not None and top[0]['action'] == 'move'
+                and len(patches) == 1 and len(top[0]['patches']) == 1
+                and top[0]['patches'][0]['id'] == patches[0]['id']):
+            # same task moved again: one entry from the first origin to the latest spot
+            top[0]['patches'][0]['after'] = patches[0]['after']
+            if self.log is not None:
+                self.log.truncate(top[2])
+                top[2] = self._log_append(top[0])
+        else:
+            entry = {'action': action, 'patches': patches}
+            size = entry_size(entry)
+            self.undo_stack.append([entry, size, self._log_append(entry)])
+            self.undo_bytes += size
+            self._trim()
+        self.redo_stack.clear()
+        self.redo_bytes = 0
+
+    def _trim(self):
+        # only drops from memory, the log still has them
+        while self.undo_bytes > self.budget_bytes and len(self.undo_stack) > 1:
+            _, size, _ = self.undo_stack.popleft()
+            self.undo_bytes -= size
+
+    def pop_undo(self):
+        # returns the patches to apply, already inverted
+        if self.undo_stack:
+            entry, size, offset = self.undo_stack.pop()
+            self.undo_bytes -= size
+            if self.log is not None:
+                self.log.truncate(offset)
+        elif self.log is not None:
+            entry = self.log.pop_tail()
+            if entry is None:
+                return None
+            size = entry_size(entry)
+        else:
+            return None
+        self.redo_stack.append([entry, size])
+        self.redo_bytes += size
+        return [invert(p) for p in reversed(entry['patches'])]
+
+    def pop_redo(self):
+        if not self.redo_stack:
+            return None
+        entry, size = self.redo_stack.pop()
+        self.redo_bytes -= size
+        self.undo_stack.append([entry, size, self._log_append(entry)])
+        self.undo_bytes += size
+        self._trim()
+        return list(entry['patches'])
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.undo_bytes = 0
+        self.redo_bytes = 0
+        if self.log is not None:
+            self.log.truncate(0)
+
+    def rollback_session(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.undo_bytes = 0
+        self.redo_bytes = 0
+        if self.log is not None:
+            self.log.rollback_session()
+
+    def memory_bytes(self):
+        return self.undo_bytes + self.redo_bytes
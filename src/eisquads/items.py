@@ -1,20 +1,21 @@
-from PyQt6.QtCore import Qt, QPoint, QRect, pyqtSignal
-from PyQt6.QtGui import QColor, QPainter, QBrush, QFont, QFontMetrics
+import itertools
+import time
+from PyQt6.QtCore import Qt, QObject, QPoint, QPointF, QRect, pyqtSignal
+from PyQt6.QtGui import QColor, QPainter, QBrush
 from PyQt6.QtWidgets import QWidget
 from config import UiConfig
 from models import Task
+from textcache import label_cache
+from tracing import traced
+from layout import (PLACEMENTS, LABEL_MAX_W, LABEL_MARGIN, BOUNDS_WEIGHT, OVERLAP_WEIGHT,
+                    AXIS_PENALTY, VERTICAL_PENALTY, OFF_CENTER_PENALTY, HYSTERESIS_BONUS)
 
-class TaskDot(QWidget):
-    moved = pyqtSignal()
-    clicked = pyqtSignal(object)
-    link_started = pyqtSignal(object)
-    link_dragging = pyqtSignal(QPoint)
-    link_ended = pyqtSignal(QPoint)
-    drag_started = pyqtSignal(str) # emits task id
-    drag_ended = pyqtSignal()
-
-    def __init__(self, task: Task, parent=None):
-        super().__init__(parent)
+class DotMixin:
+    # Placement, painting and mouse handling of one task, shared by TaskDot
+    # (a widget per task) and DotItem (painted by the canvas itself). The host
+    # class provides parent(), geometry(), setGeometry(), pos(), isVisible(),
+    # update() and raise_(), plus the signals.
+    def init_dot(self, task: Task):
         self.task = task
         self.dragging = False
         self.linking = False
@@ -24,15 +25,9 @@ class TaskDot(QWidget):
         self.text_rect = QRect()
         self.text_align = Qt.AlignmentFlag.AlignLeft
         self.current_pos_type = 'right'
-        self.update_position()
-        self.show()
+        self.reach_rect = QRect() # everything any label candidate could cover
 
-    def update_position(self):
-        if not self.parent(): return
-        
-        p_w = self.parent().width()
-        p_h = self.parent().height()
-        
+    def layout_inputs(self, p_w, p_h):
         # dot position (top-left of the dot itself)
         dot_x = int(self.task.x * p_w)
         dot_y = int(self.task.y * p_h)
@@ -42,22 +37,33 @@ class TaskDot(QWidget):
         dot_x = max(0, min(dot_x, p_w - ds))
         dot_y = max(0, min(dot_y, p_h - ds))
         
-        font = QFont(UiConfig.DOT_FONT, UiConfig.DOT_FONT_SIZE)
-        fm = QFontMetrics(font)
-        label = self.task.title
-        
-        MAX_W = 100
-        rect = fm.boundingRect(QRect(0, 0, MAX_W, 0), Qt.TextFlag.TextWordWrap, label)
+        rect = label_cache.measure(self.task.title, LABEL_MAX_W)
         text_w = rect.width() + 5
         text_h = rect.height()
+        return dot_x, dot_y, text_w, text_h
+
+    @traced('update_position')
+    def update_position(self):
+        if not self.parent(): return
         
-        siblings = [c for c in self.parent().children() if isinstance(c, TaskDot) and c is not self and c.isVisible()]
+        p_w = self.parent().width()
+        p_h = self.parent().height()
+        ds = UiConfig.DOT_SIZE
+        dot_x, dot_y, text_w, text_h = self.layout_inputs(p_w, p_h)
         
         candidates = []
         # generate candidates including aligned vertical ones
-        for p_type in ['right', 'left', 'top-center', 'top-left', 'top-right', 'bottom-center', 'bottom-left', 'bottom-right']:
+        for p_type in PLACEMENTS:
             candidates.append(self._create_candidate(p_type, dot_x, dot_y, text_w, text_h, ds))
 
+        margin = LABEL_MARGIN  # stricter spacing
+        # only dots near the candidate area can add an overlap penalty
+        reach = candidates[0]['geo']
+        for cand in candidates[1:]:
+            reach = reach.united(cand['geo'])
+        reach = reach.adjusted(-margin, -margin, margin, margin)
+        sib_rects = [sib.geometry() for sib in self._siblings_near(reach)]
+
         best = None
         min_score = float('inf')
         
@@ -84,50 +90,72 @@ class TaskDot(QWidget):
             g = cand['geo']
             
             # 1. screen bounds penalty
-            if g.left() < 0: conflict_score += abs(g.left()) * 10
-            if g.top() < 0: conflict_score += abs(g.top()) * 10
-            if g.right() > p_w: conflict_score += (g.right() - p_w) * 10
-            if g.bottom() > p_h: conflict_score += (g.bottom() - p_h) * 10
+            if g.left() < 0: conflict_score += abs(g.left()) * BOUNDS_WEIGHT
+            if g.top() < 0: conflict_score += abs(g.top()) * BOUNDS_WEIGHT
+            if g.right() > p_w: conflict_score += (g.right() - p_w) * BOUNDS_WEIGHT
+            if g.bottom() > p_h: conflict_score += (g.bottom() - p_h) * BOUNDS_WEIGHT
             
             # 2. overlap penalty
-            margin = 10  # stricter spacing
             g_inflated = g.adjusted(-margin, -margin, margin, margin)
-            for sib in siblings:
-                if g_inflated.intersects(sib.geometry()):
-                    intersect = g_inflated.intersected(sib.geometry())
+            for sib_rect in sib_rects:
+                if g_inflated.intersects(sib_rect):
+                    intersect = g_inflated.intersected(sib_rect)
                     area = intersect.width() * intersect.height()
-                    conflict_score += area * 5.0
+                    conflict_score += area * OVERLAP_WEIGHT
             
             # 4. axis crossing penalty (strict quadrant enforcement)
             # check if candidate is fully contained within the quadrant
             if not quadrant_rect.contains(g):
-                conflict_score += 10000 # massive penalty, do not cross the streams
+                conflict_score += AXIS_PENALTY # massive penalty, do not cross the streams
             
             score += conflict_score
 
             # 3. preference penalty
             # we prefer side labels, top/bottom are a last resort
             if 'top' in cand['type'] or 'bottom' in cand['type']:
-                score += 50
+                score += VERTICAL_PENALTY
                 # prefer centered if vertical
                 if 'center' not in cand['type']:
-                    score += 5
+                    score += OFF_CENTER_PENALTY
             
             # Hysteresis: stick to current if no conflict
             if cand['type'] == self.current_pos_type and conflict_score == 0:
-                score -= 60
+                score -= HYSTERESIS_BONUS
 
             if score < min_score:
                 min_score = score
                 best = cand
         
         if best:
-            self.current_pos_type = best['type']
-            self.dot_local_pos = best['dot_local']
-            self.text_rect = best['text_rect']
-            self.text_align = best['align']
-            self.setGeometry(best['geo'])
-            self.update()
+            self.apply_candidate(best, reach)
+
+    def place(self, p_type, reach):
+        # take a placement decided elsewhere (the board-wide solver)
+        if not self.parent(): return
+        dot_x, dot_y, text_w, text_h = self.layout_inputs(self.parent().width(), self.parent().height())
+        cand = self._create_candidate(p_type, dot_x, dot_y, text_w, text_h, UiConfig.DOT_SIZE)
+        self.apply_candidate(cand, reach)
+
+    def apply_candidate(self, best, reach):
+        old_geo = self.geometry()
+        old_center = self.get_dot_center()
+        self.current_pos_type = best['type']
+        self.dot_local_pos = best['dot_local']
+        self.text_rect = best['text_rect']
+        self.text_align = best['align']
+        self.setGeometry(best['geo'])
+        self.reach_rect = reach
+        # let the canvas update its indexes and note what needs relayout
+        placed = getattr(self.parent(), 'dot_placed', None)
+        if placed is not None:
+            placed(self, old_geo, old_center)
+        self.update()
+
+    def _siblings_near(self, rect):
+        # the canvas keeps a spatial index of dot rects; fall back to a full scan without one
+        index = getattr(self.parent(), 'dot_index', None)
+        pool = self.parent().children() if index is None else index.query(rect)
+        return [c for c in pool if isinstance(c, DotMixin) and c is not self and c.isVisible()]
 
     def _create_candidate(self, p_type, dx, dy, tw, th, ds):
         pad = 5
@@ -225,8 +253,8 @@ class TaskDot(QWidget):
         else:
             return "#585b70" # grey (not urg/not imp)
 
-    def paintEvent(self, event):
-        painter = QPainter(self)
+    def paint(self, painter):
+        # painter origin is the top-left of geometry()
         painter.setRenderHint(QPainter.RenderHint.Antialiasing)
         
         # draw dot with dynamic color
@@ -236,27 +264,35 @@ class TaskDot(QWidget):
         
         # draw label
         painter.setPen(QColor(UiConfig.TEXT_COLOR))
-        font = QFont(UiConfig.DOT_FONT, UiConfig.DOT_FONT_SIZE)
-        if self.task.completed:
-            font.setStrikeOut(True)
+        strike = self.task.completed
+        if strike:
             painter.setPen(QColor("#6c7086")) # dim text for completed
-        painter.setFont(font)
-        label = self.task.title
-        
-        painter.drawText(self.text_rect, 
-                         self.text_align, 
-                         label)
+        painter.setFont(label_cache.font(strike))
+        if strike:
+            # QStaticText strikes out across the full wrap width, so let drawText do these
+            painter.drawText(self.text_rect, self.text_align, self.task.title)
+            return
+
+        # prepared text wraps within the rect width; vertical alignment is ours to do
+        h_align = self.text_align & Qt.AlignmentFlag.AlignHorizontal_Mask
+        v_align = self.text_align & Qt.AlignmentFlag.AlignVertical_Mask
+        static = label_cache.static_text(self.task.title, self.text_rect.width(), h_align)
+        text_h = static.size().height()
+        y = self.text_rect.top()
+        if v_align == Qt.AlignmentFlag.AlignVCenter:
+            y += (self.text_rect.height() - text_h) / 2
+        elif v_align == Qt.AlignmentFlag.AlignBottom:
+            y += self.text_rect.height() - text_h
+        painter.drawStaticText(QPointF(self.text_rect.left(), y), static)
 
     def mouseDoubleClickEvent(self, event):
         if self.parent() and getattr(self.parent(), 'bg_adjusting', False):
             return
 
         if event.button() == Qt.MouseButton.LeftButton:
-            if self.parent():
-                self.parent().push_undo('complete')
             self.task.completed = not self.task.completed
             self.update()
-            self.moved.emit()
+            self.toggled.emit(self)
 
     def mousePressEvent(self, event):
         if self.parent() and (getattr(self.parent(), 'locked', False) or getattr(self.parent(), 'bg_adjusting', False)):
@@ -276,13 +312,30 @@ class TaskDot(QWidget):
             
             self.raise_()
 
+    def _paced(self, kind, fn):
+        # at most one drag / link-drag step per display frame, the latest pointer wins
+        pacer = getattr(self.parent(), 'pacer', None)
+        if pacer is None:
+            fn()
+        else:
+            pacer.post((kind, self), fn)
+
+    def _flush_paced(self, kind):
+        pacer = getattr(self.parent(), 'pacer', None)
+        if pacer is not None:
+            pacer.flush((kind, self))
+
     def mouseMoveEvent(self, event):
+        curr_global = event.globalPosition().toPoint()
         if self.linking:
-            self.link_dragging.emit(event.globalPosition().toPoint())
+            self._paced('link', lambda: self.link_dragging.emit(curr_global))
             return
 
         if self.dragging and self.parent():
-            curr_global = event.globalPosition().toPoint()
+            self._paced('drag', lambda: self.drag_to(curr_global))
+
+    def drag_to(self, curr_global):
+        if self.dragging and self.parent():
             delta = curr_global - self.drag_start_global
             
             new_dot_x = self.drag_start_dot_pos.x() + delta.x()
@@ -296,8 +349,12 @@ class TaskDot(QWidget):
             self.task.x = new_dot_x / p_w
             self.task.y = new_dot_y / p_h
             
+            perf = getattr(self.parent(), 'perf', None)
+            start = time.perf_counter() if perf is not None and perf.enabled else None
             self.update_position()
-            self.moved.emit()
+            if start is not None:
+                perf.record('update_position', start)
+            self.moved.emit(self)
             
     def _resolve_overlap(self, current_pos, axis_pos, size):
         if current_pos < axis_pos and (current_pos + size) > axis_pos:
@@ -309,13 +366,15 @@ class TaskDot(QWidget):
         return current_pos
 
     def _resolve_dot_overlap(self, x, y, p_w, p_h):
-        siblings = [c for c in self.parent().children() if isinstance(c, TaskDot) and c is not self and c.isVisible()]
         ds = UiConfig.DOT_SIZE
         min_dist = ds
         
         # Simple iterative solver to push away from overlapping dots
         for _ in range(5): # Try a few times to resolve
             moved = False
+            # a dot sits inside its widget rect, give it a dot size of slack for edge clamping
+            near = QRect(int(x) - 2 * ds, int(y) - 2 * ds, 5 * ds, 5 * ds)
+            siblings = self._siblings_near(near)
             for sib in siblings:
                 sib_x = int(sib.task.x * p_w)
                 sib_y = int(sib.task.y * p_h)
@@ -351,13 +410,14 @@ class TaskDot(QWidget):
 
     def mouseReleaseEvent(self, event):
         if self.linking:
+            self._flush_paced('link')
             self.linking = False
             self.link_ended.emit(event.globalPosition().toPoint())
             return
 
         if self.dragging:
+            self._flush_paced('drag') # the last move still waiting for its frame
             self.dragging = False
-            self.drag_ended.emit()
             
             if self.parent():
                 p_w, p_h = self.parent().width(), self.parent().height()
@@ -378,7 +438,9 @@ class TaskDot(QWidget):
                     self.task.y = new_y / p_h
                     self.update_position()
 
-            self.moved.emit()
+            self.moved.emit(self)
+            # emitted last so listeners see the final, overlap-resolved position
+            self.drag_ended.emit()
             
         elif event.button() == Qt.MouseButton.LeftButton:
             self.clicked.emit(self)
@@ -387,3 +449,81 @@ class TaskDot(QWidget):
         ds = UiConfig.DOT_SIZE
         center_local = self.dot_local_pos + QPoint(ds // 2, ds // 2)
         return self.pos() + center_local
+
+class TaskDot(DotMixin, QWidget):
+    moved = pyqtSignal(object)
+    toggled = pyqtSignal(object) # completed flag flipped
+    clicked = pyqtSignal(object)
+    link_started = pyqtSignal(object)
+    link_dragging = pyqtSignal(QPoint)
+    link_ended = pyqtSignal(QPoint)
+    drag_started = pyqtSignal(str) # emits task id
+    drag_ended = pyqtSignal()
+
+    def __init__(self, task: Task, parent=None):
+        super().__init__(parent)
+        self.init_dot(task) # placed by the canvas, see add_dot_widget
+        self.show()
+
+    def paintEvent(self, event):
+        self.paint(QPainter(self))
+
+_z_order = itertools.count()
+
+class DotItem(DotMixin, QObject):
+    # A task dot without a widget: the canvas paints it and routes mouse
+    # events to it after its own hit test, see MatrixCanvas.dot_at.
+    moved = pyqtSignal(object)
+    toggled = pyqtSignal(object) # completed flag flipped
+    clicked = pyqtSignal(object)
+    link_started = pyqtSignal(object)
+    link_dragging = pyqtSignal(QPoint)
+    link_ended = pyqtSignal(QPoint)
+    drag_started = pyqtSignal(str) # emits task id
+    drag_ended = pyqtSignal()
+
+    def __init__(self, task: Task, parent=None):
+        super().__init__(parent)
+        self._geo = QRect()
+        self._visible = True
+        self.z = next(_z_order) # paint / hit-test order, raise_ moves it on top
+        self.init_dot(task) # placed by the canvas, see add_dot_widget
+
+    def geometry(self):
+        return QRect(self._geo)
+
+    def setGeometry(self, rect):
+        if rect == self._geo:
+            return
+        self.update()
+        self._geo = QRect(rect)
+        self.update()
+
+    def pos(self):
+        return self._geo.topLeft()
+
+    def isVisible(self):
+        # like a child widget: only visible while the canvas is
+        canvas = self.parent()
+        return self._visible and canvas is not None and canvas.isVisible()
+
+    def show(self):
+        self._visible = True
+        self.update()
+
+    def hide(self):
+        self.update()
+        self._visible = False
+
+    def update(self):
+        canvas = self.parent()
+        if canvas is not None and self._visible:
+            canvas.update(self._geo)
+
+    def raise_(self):
+        self.z = next(_z_order)
+        self.update()
+
+    def deleteLater(self):
+        self.hide()
+        super().deleteLater()
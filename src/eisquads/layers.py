@@ -0,0 +1,82 @@
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QPainter, QPixmap
+
+class BackgroundLayer:
+    # The background photo already scaled, cropped to the canvas and with its
+    # opacity baked in, so a repaint is one unscaled blit. Rebuilt only when
+    # (offset, scale, opacity, size, dpr) changes; while the user is still
+    # panning/zooming the source is drawn with a fast transform instead.
+    def __init__(self):
+        self.source = None
+        self.pixmap = None
+        self.key = None
+        self.builds = 0
+
+    def set_source(self, pixmap):
+        self.source = pixmap if pixmap is not None and not pixmap.isNull() else None
+        self.pixmap = None
+        self.key = None
+
+    def draw(self, painter, size, dpr, offset, scale, opacity, fast=False):
+        if self.source is None:
+            return
+        if fast:
+            painter.save()
+            painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, False)
+            self._paint_source(painter, offset, scale, opacity)
+            painter.restore()
+            return
+
+        key = (offset.x(), offset.y(), scale, opacity, size.width(), size.height(), dpr)
+        if key != self.key:
+            self.pixmap = self._build(size, dpr, offset, scale, opacity)
+            self.key = key
+        painter.drawPixmap(0, 0, self.pixmap)
+
+    def _build(self, size, dpr, offset, scale, opacity):
+        pixmap = QPixmap(max(1, round(size.width() * dpr)), max(1, round(size.height() * dpr)))
+        pixmap.setDevicePixelRatio(dpr)
+        pixmap.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+        self._paint_source(painter, offset, scale, opacity)
+        painter.end()
+        self.builds += 1
+        return pixmap
+
+    def _paint_source(self, painter, offset, scale, opacity):
+        painter.setOpacity(opacity)
+        painter.translate(offset)
+        painter.scale(scale, scale)
+        painter.drawPixmap(0, 0, self.source)
+
+    def clear(self):
+        self.pixmap = None
+        self.key = None
+
+class ChromeLayer:
+    # Retained pixmap of the static canvas chrome (corner clip, background,
+    # axes, labels). `paint` is only called when the caller's key or the
+    # device pixel ratio changes; every other repaint is a single blit.
+    def __init__(self):
+        self.pixmap = None
+        self.key = None
+        self.builds = 0
+
+    def draw(self, painter, key, size, dpr, paint):
+        key = (key, dpr) # moved to a screen with another pixel ratio: rebuild, sharp
+        if key != self.key or self.pixmap is None:
+            pixmap = QPixmap(max(1, round(size.width() * dpr)), max(1, round(size.height() * dpr)))
+            pixmap.setDevicePixelRatio(dpr)
+            pixmap.fill(Qt.GlobalColor.transparent)
+            p = QPainter(pixmap)
+            paint(p)
+            p.end()
+            self.pixmap = pixmap
+            self.key = key
+            self.builds += 1
+        painter.drawPixmap(0, 0, self.pixmap)
+
+    def clear(self):
+        self.pixmap = None
+        self.key = None
@@ -0,0 +1,201 @@
+from config import UiConfig
+
+np = None # imported on first use, it is the bulk of the startup import time
+
+def have_numpy():
+    global np
+    if np is None:
+        try:
+            import numpy
+            np = numpy
+        except ImportError: # the greedy per-dot placement in TaskDot still works without it
+            np = False
+    return np is not False
+
+# label placement candidates, in tie-break order
+PLACEMENTS = ['right', 'left', 'top-center', 'top-left', 'top-right', 'bottom-center', 'bottom-left', 'bottom-right']
+
+# scoring weights, shared with TaskDot.update_position
+LABEL_MAX_W = 100
+LABEL_MARGIN = 10        # spacing kept around a label
+BOUNDS_WEIGHT = 10       # per pixel outside the canvas
+OVERLAP_WEIGHT = 5.0     # per pixel of overlap with a sibling
+AXIS_PENALTY = 10000     # label crosses into another quadrant
+VERTICAL_PENALTY = 50    # top/bottom labels are a last resort
+OFF_CENTER_PENALTY = 5   # ...and centered ones are preferred
+HYSTERESIS_BONUS = 60    # keep the current spot while it is conflict free
+
+def _candidate_rects(dx, dy, tw, th, ds):
+    # vectorized TaskDot._create_candidate: (N, 8) arrays of x, y, w, h
+    n = len(dx)
+    x = np.empty((n, 8), dtype=np.int64)
+    y = np.empty((n, 8), dtype=np.int64)
+    w = np.empty((n, 8), dtype=np.int64)
+    h = np.empty((n, 8), dtype=np.int64)
+
+    side_pad, vert_pad = 5, 1
+    total_h = np.maximum(ds, th)
+    total_w = np.maximum(ds, tw)
+
+    # right / left
+    x[:, 0] = dx
+    x[:, 1] = dx - tw - side_pad
+    w[:, 0] = w[:, 1] = ds + side_pad + tw
+    h[:, 0] = h[:, 1] = total_h
+    y[:, 0] = y[:, 1] = dy - (total_h - ds) // 2
+
+    # top-* and bottom-*
+    for base, top in ((2, True), (5, False)):
+        w[:, base:base + 3] = total_w[:, None]
+        h[:, base:base + 3] = (th + vert_pad + ds)[:, None]
+        y[:, base:base + 3] = (dy - th - vert_pad if top else dy)[:, None]
+        x[:, base] = dx - (total_w - ds) // 2     # center
+        x[:, base + 1] = dx                       # left aligned
+        x[:, base + 2] = dx + ds - total_w        # right aligned
+    return x, y, w, h
+
+def _near_pairs(rx, ry, rw, rh, cell=128):
+    # (i, j) pairs whose reach rects intersect, both ways round, found by
+    # binning into a grid. Every label a dot can take lies inside its reach,
+    # so these pairs cover all overlaps the solver can ever see.
+    n = len(rx)
+    x0, y0 = rx // cell, ry // cell
+    span_x = (rx + rw) // cell - x0 + 1
+    span_y = (ry + rh) // cell - y0 + 1
+
+    # one (cell, dot) entry per cell a reach rect touches
+    counts = span_x * span_y
+    dot = np.repeat(np.arange(n), counts)
+    k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    cx = x0[dot] + k // span_y[dot]
+    cy = y0[dot] + k % span_y[dot]
+    cell_id = (cx - cx.min()) * (cy.max() - cy.min() + 1) + (cy - cy.min())
+
+    order = np.argsort(cell_id, kind='stable')
+    cell_id, dot, cx, cy = cell_id[order], dot[order], cx[order], cy[order]
+
+    # every entry against the ones after it in the same cell, so i < j once per cell
+    starts = np.flatnonzero(np.r_[True, np.diff(cell_id) != 0])
+    sizes = np.diff(np.r_[starts, len(dot)])
+    rank = np.arange(len(dot)) - np.repeat(starts, sizes)
+    after = np.repeat(sizes, sizes) - rank - 1
+    first = np.repeat(np.arange(len(dot)), after)
+    second = first + 1 + np.arange(after.sum()) - np.repeat(np.cumsum(after) - after, after)
+    i, j = dot[first], dot[second]
+
+    # two rects spanning several cells meet in several of them; only the cell
+    # holding the top-left of where they meet counts the pair
+    keep = (cx[first] == np.maximum(x0[i], x0[j])) & (cy[first] == np.maximum(y0[i], y0[j]))
+    i, j = i[keep], j[keep]
+    keep = ((rx[i] < rx[j] + rw[j]) & (rx[j] < rx[i] + rw[i]) &
+            (ry[i] < ry[j] + rh[j]) & (ry[j] < ry[i] + rh[i]))
+    i, j = i[keep], j[keep]
+    return np.concatenate([i, j]), np.concatenate([j, i])
+
+def solve_labels(dots, p_w, p_h, max_rounds=6):
+    # Board-wide label placement. All 8*N candidates are scored at once with
+    # the same weights as TaskDot.update_position; each round every dot takes
+    # its best candidate against the others' current labels, until nothing
+    # changes. Returns (placement names, reach rects as (x, y, w, h)).
+    n = len(dots)
+    ds = UiConfig.DOT_SIZE
+    inputs = np.array([d.layout_inputs(p_w, p_h) for d in dots], dtype=np.int64).reshape(n, 4)
+    dx, dy, tw, th = inputs.T
+    visible = np.array([d.isVisible() for d in dots], dtype=bool)
+    current = np.array([PLACEMENTS.index(d.current_pos_type) for d in dots], dtype=np.int64)
+
+    cx_, cy_, cw, ch = _candidate_rects(dx, dy, tw, th, ds)
+    m = LABEL_MARGIN
+
+    # reach: union of all candidates, inflated by the margin
+    rx = cx_.min(axis=1) - m
+    ry = cy_.min(axis=1) - m
+    rw = (cx_ + cw).max(axis=1) + m - rx
+    rh = (cy_ + ch).max(axis=1) + m - ry
+
+    # --- static part of the score: bounds, quadrant, preference ---
+    static = np.zeros((n, 8))
+    right = cx_ + cw - 1   # QRect.right() is inclusive
+    bottom = cy_ + ch - 1
+    static += np.where(cx_ < 0, -cx_ * BOUNDS_WEIGHT, 0)
+    static += np.where(cy_ < 0, -cy_ * BOUNDS_WEIGHT, 0)
+    static += np.where(right > p_w, (right - p_w) * BOUNDS_WEIGHT, 0)
+    static += np.where(bottom > p_h, (bottom - p_h) * BOUNDS_WEIGHT, 0)
+
+    mid_x, mid_y = p_w // 2, p_h // 2
+    is_left = (dx + ds // 2) < mid_x
+    is_top = (dy + ds // 2) < mid_y
+    q_left = np.where(is_left, 0, mid_x)[:, None]
+    q_right = np.where(is_left, mid_x, p_w)[:, None]
+    q_top = np.where(is_top, 0, mid_y)[:, None]
+    q_bottom = np.where(is_top, mid_y, p_h)[:, None]
+    inside = (cx_ >= q_left) & (cx_ + cw <= q_right) & (cy_ >= q_top) & (cy_ + ch <= q_bottom)
+    static += np.where(inside, 0, AXIS_PENALTY)
+
+    preference = np.array([0, 0, VERTICAL_PENALTY] + [VERTICAL_PENALTY + OFF_CENTER_PENALTY] * 2 +
+                          [VERTICAL_PENALTY] + [VERTICAL_PENALTY + OFF_CENTER_PENALTY] * 2, dtype=float)
+
+    # --- pairwise overlap against the other dots' chosen labels ---
+    pi, pj = _near_pairs(rx, ry, rw, rh)
+    mask = visible[pj]
+    pi, pj = pi[mask], pj[mask]
+
+    # current label rects. A dot that was never placed (new, or back from the
+    # pool) has no reach yet and no label either, whatever its geometry says
+    geo = np.zeros((n, 4), dtype=np.int64)
+    for k, d in enumerate(dots):
+        if not d.reach_rect.isNull():
+            g = d.geometry()
+            geo[k] = g.x(), g.y(), g.width(), g.height()
+
+    # inflated candidates, and the area each one shares with a neighbour's
+    # label. int32 and in place, these are the biggest arrays of the solve
+    ix0, iy0 = (cx_ - m).astype(np.int32), (cy_ - m).astype(np.int32)
+    ix1, iy1 = (cx_ + cw + m).astype(np.int32), (cy_ + ch + m).astype(np.int32)
+    def shared(pi, pj, gx, gy, gw, gh):
+        ox = np.minimum(ix1[pi], (gx + gw)[pj, None])
+        ox -= np.maximum(ix0[pi], gx[pj, None])
+        oy = np.minimum(iy1[pi], (gy + gh)[pj, None])
+        oy -= np.maximum(iy0[pi], gy[pj, None])
+        np.maximum(ox, 0, out=ox)
+        np.maximum(oy, 0, out=oy)
+        ox *= oy
+        return ox
+    def overlap_of(slots, area):
+        return np.bincount(slots, weights=area.ravel(), minlength=n * 8).reshape(n, 8) * OVERLAP_WEIGHT
+    def slots_of(pi):
+        return (pi[:, None] * 8 + np.arange(8)).ravel()
+
+    gx, gy, gw, gh = geo.T.astype(np.int32)
+    slots = slots_of(pi)
+    overlap = overlap_of(slots, shared(pi, pj, gx, gy, gw, gh))
+    choice = current.copy()
+    rows = np.arange(n)
+    for _ in range(max_rounds):
+        conflict = static + overlap
+        score = conflict + preference
+        keep = (np.arange(8)[None, :] == choice[:, None]) & (conflict == 0)
+        score = score - np.where(keep, HYSTERESIS_BONUS, 0)
+        best = np.argmin(score, axis=1) # first minimum wins, like the greedy loop
+
+        changed = best != choice
+        if not changed.any():
+            break
+        choice = best
+        old = gx, gy, gw, gh
+        gx = ix0[rows, choice] + m
+        gy = iy0[rows, choice] + m
+        gw = cw[rows, choice].astype(np.int32)
+        gh = ch[rows, choice].astype(np.int32)
+        # Once the labels settle only pairs next to one that moved change. The
+        # first round also replaces stale geometry, so compare rects, not choices
+        moved = ((gx != old[0]) | (gy != old[1]) | (gw != old[2]) | (gh != old[3]))[pj]
+        if moved.sum() * 2 > len(pj):
+            overlap = overlap_of(slots, shared(pi, pj, gx, gy, gw, gh))
+        else:
+            qi, qj = pi[moved], pj[moved]
+            overlap += overlap_of(slots_of(qi), shared(qi, qj, gx, gy, gw, gh) - shared(qi, qj, *old))
+
+    names = [PLACEMENTS[k] for k in choice]
+    reach = list(zip(rx.tolist(), ry.tolist(), rw.tolist(), rh.tolist()))
+    return names, reach
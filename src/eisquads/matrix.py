@@ -1,24 +1,75 @@
-import uuid
-from PyQt6.QtCore import Qt, QPoint, QPointF
-from PyQt6.QtGui import QColor, QPainter, QPen, QFont, QCursor, QPainterPath, QPainterPathStroker, QPixmap
+import sys
+import time
+from collections import deque
+from PyQt6.QtCore import Qt, QPoint, QPointF, QRect, QRectF, QTimer
+from PyQt6.QtGui import QColor, QPainter, QPen, QFont, QCursor, QPainterPath, QPixmap
 from PyQt6.QtWidgets import QWidget, QPushButton, QDialog, QFrame, QApplication
-from config import UiConfig
-from models import Task, TaskManager
-from items import TaskDot
-from dialogs import NameInput, DetailPopup
-import math
+from config import UiConfig, HistoryConfig, RenderConfig, StartupConfig, get_storage_dir
+from models import Task, DependencyGraph
+from items import TaskDot, DotItem
+from persistence import WriteBehindSaver, IoWorker
+from spatial import GridIndex
+from edges import EdgeGeometry, EdgeGeometryCache
+from history import History, HistoryLog
+from textcache import label_cache
+from layers import BackgroundLayer, ChromeLayer
+from perf import PerfMonitor, PerfHud
+from pacing import FramePacer
+import layout
+from startup import mark
+from tracing import traced
+
+DOT_POOL_MAX = 256 # removed dots kept for reuse, the rest are deleted
 
 class MatrixCanvas(QFrame):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.tasks = []
+        self.graph = DependencyGraph() # links of self.tasks, every link change goes through it
         self.dots = []
+        self.dot_by_id = {}
+        self.batched = RenderConfig.RENDERER == "batched" # dots are DotItems painted here, not widgets
+        self.grabbed_dot = None # batched mode: dot receiving the current press/move/release
+        self.pacer = FramePacer(self) if RenderConfig.FRAME_PACING else None # used by the dots' drags
+        self.dot_pool = [] # hidden dots of removed tasks, reused before building new ones
+        self.edge_cache = EdgeGeometryCache() # (from_id, to_id) -> drawn path, arrowhead, hit outline
+        self.dot_index = GridIndex() # dot rects, kept current by update_position
+        self.reach_index = GridIndex(cell_size=128) # area each dot's label candidates can cover
+        self.dirty_footprints = deque() # rects vacated or newly covered since the last relayout, oldest first
+        self.relayout_seen = set() # dots the unfinished relayout already re-placed
+        self.relayout_rest = QTimer(self) # carries on a relayout that ran out of its frame slice
+        self.relayout_rest.setSingleShot(True)
+        self.relayout_rest.timeout.connect(self.continue_relayout)
+        self.last_relaid = 0 # debug: dots re-placed by the last incremental relayout
         self.locked = False
         self.temp_link_start = None
         self.temp_link_end = None
-        self.undo_stack = []
-        self.redo_stack = []
+        self.temp_link_geo = None # what was last drawn for the link being dragged
+        self.edge_damage = set() # links whose new geometry still has to be repainted
+        self.drag_origin = None # (task id, x, y) when the current drag started
+        self.edit_before = None # (title, desc) while the detail popup is open
         self.overlay = DependencyOverlay(self)
+        # file I/O happens on the worker thread, in submission order
+        self.io = IoWorker(self)
+        self.io.loaded.connect(self.on_tasks_loaded)
+        self.io.failed.connect(self.on_io_failed)
+        self.io.skipped.connect(self.on_load_skipped)
+        self.io.saved.connect(self.on_io_saved)
+        # undo survives restarts: the stack is mirrored to history.log, written
+        # by the worker, and read back lazily
+        log = HistoryLog(get_storage_dir() / "history.log", HistoryConfig.LOG_MAX_BYTES, self.io)
+        self.history = History(HistoryConfig.BUDGET_BYTES, log)
+        self.load_seq = 0 # only the newest load request is applied
+        self.applied_seq = 0 # load the board was last built from, its signal may still be queued
+        self.reload_before = None # board snapshot while a reload is in flight, for its undo entry
+        self.defer_build = StartupConfig.FAST_START # fast start: dots are built in ensure_board
+        self.pending_tasks = None # loaded tasks waiting for ensure_board
+        self.io_error = None # (op, message) of the last failed file operation
+        self.notice = None # shows file errors over the board, built on the first one
+        QApplication.instance().aboutToQuit.connect(self.io.wait) # don't lose queued writes
+        self.saver = WriteBehindSaver(self.write_data, parent=self)
+        self.perf = PerfMonitor() # timings for the "perf" HUD, recorded only while it is shown
+        self.perf_hud = None
         
         # Background image state
         self.bg_pixmap = None
@@ -27,6 +78,13 @@ class MatrixCanvas(QFrame):
         self.bg_scale = 1.0
         self.bg_opacity = 0.3
         self.bg_adjusting = False
+        self.bg_layer = BackgroundLayer()
+        self.chrome = ChromeLayer() # clip, background, axes and labels, redrawn only when they change
+        self.bg_moving = False # fast, unsmoothed background until the settle timer fires
+        self.bg_settle = QTimer(self)
+        self.bg_settle.setSingleShot(True)
+        self.bg_settle.setInterval(UiConfig.BG_SETTLE_MS)
+        self.bg_settle.timeout.connect(self.on_bg_settled)
         self.panning = False
         self.pan_start = QPoint()
         self.radii = (0, 0, 0, 0) # tl, tr, bl, br
@@ -48,48 +106,149 @@ class MatrixCanvas(QFrame):
         if not path: return
         self.bg_path = path
         self.bg_pixmap = QPixmap(path)
+        self.bg_layer.set_source(self.bg_pixmap)
+        self.chrome.clear() # the file name may be reused for a new image
+        self.update()
+
+    def bg_changed(self):
+        # offset/scale/opacity is changing, keep repaints cheap until it stops
+        self.bg_moving = True
+        self.bg_settle.start()
+        self.update()
+
+    def on_bg_settled(self):
+        self.bg_moving = False
         self.update()
 
     def init_ui(self):
-        self.tasks = TaskManager.load_tasks()
+        # the board fills in when the worker hands the tasks back
+        self.load_seq = self.io.load()
+
+    def on_tasks_loaded(self, seq, tasks):
+        if seq != self.load_seq or seq == self.applied_seq:
+            return # a newer load is on its way, or ensure_board took this one already
+        if self.saver.blocked:
+            # edits made since the failed load were on a stand-in board, the loaded one replaces it
+            self.saver.blocked = False
+            self.saver.discard()
+            if self.notice is not None:
+                self.notice.clear('load')
+        if self.defer_build:
+            self.pending_tasks = tasks
+            mark(f"tasks loaded ({len(tasks)})")
+            return
+        self.applied_seq = seq
+        self.tasks = tasks
         self.refresh_dots()
+        mark(f"board built ({len(self.dots)} dots)")
+        if self.reload_before is not None:
+            # keeps older patches meaningful: undo steps back to the pre-reload board first
+            self.push_undo('reload', [{'op': 'replace', 'before': self.reload_before, 'after': self.snapshot_tasks()}])
+            self.reload_before = None
+
+    def ensure_board(self):
+        # fast start: build the board now, waiting for the load if it is still running
+        if not self.defer_build:
+            return
+        if self.pending_tasks is None:
+            # its `loaded` signal is queued behind this call, take the result from the worker
+            self.io.wait_for(self.load_seq)
+            loaded = self.io.last_loaded
+            if loaded is not None and loaded[0] == self.load_seq:
+                self.pending_tasks = loaded[1]
+        self.defer_build = False
+        tasks, self.pending_tasks = self.pending_tasks, None
+        if tasks is not None:
+            self.on_tasks_loaded(self.load_seq, tasks)
+
+    def on_io_failed(self, seq, op, message):
+        self.io_error = (op, message)
+        print(f"{op} failed: {message}", file=sys.stderr)
+        if op == 'save':
+            self.saver.retry()
+            self.show_notice('save', f"Could not save: {message}\nChanges are kept and written again with the next save.")
+        elif op == 'load':
+            if seq == self.load_seq:
+                # the board is unchanged, no reload undo entry is coming for it
+                self.reload_before = None
+                # saving now would replace the file with whatever board is shown
+                self.saver.blocked = True
+                self.show_notice('load', f"Could not load the tasks, saving is off until a reload (F5) works.\n{message}")
+        elif op == 'backup':
+            self.show_notice('backup', f"Could not back up the tasks: {message}")
+        elif op == 'restore':
+            self.show_notice('restore', f"Could not restore the backup: {message}")
+        elif op == 'history':
+            self.show_notice('history', f"Could not write the undo history: {message}")
+
+    def on_load_skipped(self, seq, message):
+        print(f"some tasks could not be loaded:\n{message}", file=sys.stderr)
+        self.show_notice('load', f"Some tasks could not be loaded and were left out.\n{message}")
+
+    def show_notice(self, kind, text):
+        if self.notice is None:
+            from dialogs import Notice
+            self.notice = Notice(self)
+        self.notice.show_message(kind, text)
+
+    def on_io_saved(self, seq, ms):
+        if self.perf.enabled:
+            self.perf.add('save_write', ms)
+        if self.notice is not None and not self.saver.dirty:
+            self.notice.clear('save')
+
+    def toggle_perf(self):
+        if self.perf_hud is None:
+            self.perf_hud = PerfHud(self)
+        self.perf.enabled = not self.perf.enabled
+        if self.perf.enabled:
+            self.perf.reset()
+            self.perf_hud.start()
+        else:
+            self.perf_hud.stop()
 
     def resizeEvent(self, event):
         # place add button in top right corner
         self.add_btn.move(self.width() - 40, 10)
         self.overlay.resize(self.size())
+        if self.notice is not None:
+            self.notice.place()
         # reposition dots based on new size
-        for dot in self.dots:
-            dot.update_position()
+        self.layout_all()
         super().resizeEvent(event)
         
+    def dot_at(self, pos):
+        # topmost dot whose rect (dot and label) contains pos
+        if self.batched:
+            hits = [d for d in self.dot_index.query_point(pos.x(), pos.y())
+                    if d.isVisible() and d.geometry().contains(pos)]
+            return max(hits, key=lambda d: d.z, default=None)
+        target = self.childAt(pos)
+        # childAt might return the label or other parts, walk up to find TaskDot
+        while target and not isinstance(target, TaskDot):
+            target = target.parent()
+        return target
+
     def mouseDoubleClickEvent(self, event):
+        if self.batched:
+            dot = self.dot_at(event.position().toPoint())
+            if dot is not None:
+                dot.mouseDoubleClickEvent(event)
+                return
+
         if self.bg_adjusting:
             return
 
         if event.button() == Qt.MouseButton.LeftButton:
             # Check if we clicked on a dependency line
-            click_pos = event.pos()
-            dot_map = {d.task.id: d for d in self.dots}
-            
-            for dot in self.dots:
-                start_center = dot.get_dot_center()
-                for dep_id in dot.task.dependencies:
-                    if dep_id in dot_map:
-                        end_dot = dot_map[dep_id]
-                        end_center = end_dot.get_dot_center()
-                        
-                        path = self.get_arrow_path(end_center, start_center)
-                        stroker = QPainterPathStroker()
-                        stroker.setWidth(10) # Hit tolerance
-                        outline = stroker.createStroke(path)
-                        
-                        if outline.contains(QPointF(click_pos)):
-                            self.push_undo('unlink')
-                            dot.task.dependencies.remove(dep_id)
-                            self.save_data()
-                            self.overlay.update()
-                            return
+            key = self.edge_at(QPointF(event.pos()))
+            if key is not None:
+                dep_id, task_id = key
+                self.push_undo('unlink', [{'op': 'unlink', 'id': task_id, 'dep': dep_id}])
+                self.graph.unlink(task_id, dep_id)
+                self.link_removed(key)
+                self.save_data(('unlink', task_id, dep_id))
+                return
 
             # normalize coordinates 0.0 - 1.0
             nx = event.pos().x() / self.width()
@@ -97,6 +256,14 @@ class MatrixCanvas(QFrame):
             self.add_new_task(nx, ny)
 
     def mousePressEvent(self, event):
+        if self.batched:
+            # what a dot widget would have received, after our own hit test
+            dot = self.dot_at(event.position().toPoint())
+            if dot is not None:
+                self.grabbed_dot = dot
+                dot.mousePressEvent(event)
+                return
+
         if self.bg_adjusting and event.button() == Qt.MouseButton.LeftButton:
             self.panning = True
             self.pan_start = event.pos()
@@ -104,14 +271,23 @@ class MatrixCanvas(QFrame):
         super().mousePressEvent(event)
 
     def mouseMoveEvent(self, event):
+        if self.grabbed_dot is not None:
+            self.grabbed_dot.mouseMoveEvent(event)
+            return
+
         if self.panning:
             delta = event.pos() - self.pan_start
             self.bg_offset += QPointF(delta)
             self.pan_start = event.pos()
-            self.update()
+            self.bg_changed()
         super().mouseMoveEvent(event)
 
     def mouseReleaseEvent(self, event):
+        if self.grabbed_dot is not None:
+            dot, self.grabbed_dot = self.grabbed_dot, None
+            dot.mouseReleaseEvent(event)
+            return
+
         if event.button() == Qt.MouseButton.LeftButton:
             self.panning = False
             self.setCursor(Qt.CursorShape.ArrowCursor)
@@ -131,7 +307,7 @@ class MatrixCanvas(QFrame):
                     self.bg_opacity = min(1.0, self.bg_opacity + step)
                 else:
                     self.bg_opacity = max(0.1, self.bg_opacity - step)
-                self.update()
+                self.bg_changed()
             event.accept()
             return
 
@@ -143,144 +319,378 @@ class MatrixCanvas(QFrame):
             mouse_pos = QPointF(event.position())
             self.bg_offset = mouse_pos - (mouse_pos - self.bg_offset) * factor
             self.bg_scale *= factor
-            self.update()
+            self.bg_changed()
             event.accept()
             return
             
         super().wheelEvent(event)
 
+    @traced('refresh_dots')
     def refresh_dots(self):
-        for dot in self.dots: dot.deleteLater()
-        self.dots = []
-        for task in self.tasks: self.add_dot_widget(task)
-        
-        # final pass to resolve overlaps after all dots added
-        for dot in self.dots:
-            dot.update_position()
+        # Reconcile dots with self.tasks by task id: dots of surviving tasks
+        # are updated in place, only added / removed tasks get or give back a
+        # dot, and only dots whose position or title changed are re-placed.
+        old = self.dot_by_id
+        self.graph = DependencyGraph(self.tasks)
+        for task_id, dot in old.items():
+            if task_id not in self.graph.tasks:
+                self.release_dot(dot)
 
-    def add_dot_widget(self, task):
-        dot = TaskDot(task, self)
+        self.dots = []
+        self.dot_by_id = {}
+        changed = []
+        for task in self.tasks:
+            dot = old.get(task.id)
+            if dot is None:
+                # placed once below, by layout_all or with the other changed dots
+                dot = self.add_dot_widget(task, place=False)
+                changed.append(dot)
+                continue
+            prev = dot.task
+            dot.task = task
+            self.dots.append(dot)
+            self.dot_by_id[task.id] = dot
+            before, after = set(prev.dependencies), self.graph.deps[task.id]
+            for dep_id in before - after:
+                self.link_removed((dep_id, task.id))
+            for dep_id in after - before:
+                self.link_added((dep_id, task.id))
+            if (prev.x, prev.y, prev.title) != (task.x, task.y, task.title):
+                changed.append(dot)
+            elif prev.completed != task.completed:
+                dot.update()
+
+        if len(changed) > len(self.dots) // 2:
+            # mostly a new board: one board-wide solve beats many local ones
+            self.edge_cache.clear()
+            self.edge_damage.clear()
+            self.layout_all()
+            self.overlay.update()
+        else:
+            for dot in changed:
+                dot.update_position()
+            self.relayout_dirty()
+            self.flush_edge_damage()
+
+    def release_dot(self, dot):
+        # take a dot off the board, keeping it around for the next added task
+        self.links_moved(dot.task.id)
+        self.forget_dot(dot)
+        dot.hide()
+        if self.grabbed_dot is dot:
+            self.grabbed_dot = None
+        if self.pacer is not None:
+            self.pacer.discard(('drag', dot))
+            self.pacer.discard(('link', dot))
+        if len(self.dot_pool) < DOT_POOL_MAX:
+            self.dot_pool.append(dot)
+        else:
+            dot.deleteLater()
+
+    @traced('layout_all')
+    def layout_all(self):
+        # board-wide label placement in one batched solve, greedy per dot without numpy
+        if self.dots and layout.have_numpy():
+            names, reach = layout.solve_labels(self.dots, self.width(), self.height())
+            for dot, p_type, r in zip(self.dots, names, reach):
+                dot.place(p_type, QRect(*r))
+        else:
+            for dot in self.dots:
+                dot.update_position()
+        self.dirty_footprints.clear()
+
+    def dot_placed(self, dot, old_geo, old_center):
+        # called by TaskDot.update_position after it picked a geometry
+        if dot.get_dot_center() != old_center:
+            self.links_moved(dot.task.id)
+        new_geo = dot.geometry()
+        known = dot in self.dot_index
+        self.dot_index.update(dot, new_geo)
+        self.reach_index.update(dot, dot.reach_rect)
+        if not known:
+            self.dirty_footprints.append(new_geo)
+        elif old_geo != new_geo:
+            self.dirty_footprints.append(old_geo)
+            self.dirty_footprints.append(new_geo)
+
+    def forget_dot(self, dot):
+        rect = self.dot_index.remove(dot)
+        self.reach_index.remove(dot)
+        if rect is not None:
+            self.dirty_footprints.append(rect)
+
+    def add_dot_widget(self, task, place=True):
+        # place=False leaves the placement to the caller, e.g. a board-wide layout_all
+        if self.dot_pool:
+            dot = self.dot_pool.pop()
+            dot.init_dot(task) # fresh state, as if newly built
+            self.dots.append(dot)
+            self.dot_by_id[task.id] = dot
+            if place:
+                dot.update_position()
+            dot.show()
+            return dot
+
+        dot = DotItem(task, self) if self.batched else TaskDot(task, self)
         dot.moved.connect(self.on_dot_moved)
+        dot.toggled.connect(self.on_dot_toggled)
         dot.link_started.connect(self.on_link_started)
         dot.link_dragging.connect(self.on_link_dragging)
         dot.link_ended.connect(self.on_link_ended)
         dot.drag_started.connect(self.on_dot_drag_start)
+        dot.drag_ended.connect(self.on_dot_drag_end)
         # dot.clicked.connect(self.show_details) # detail page hidden for now
         self.dots.append(dot)
-        dot.update_position()
+        self.dot_by_id[task.id] = dot
+        if place:
+            dot.update_position()
         dot.show()
         self.overlay.raise_()
+        return dot
 
-    def get_state(self):
-        # Deep copy of tasks state
-        return [
-            Task(t.id, t.title, t.desc, t.x, t.y, t.completed, list(t.dependencies))
-            for t in self.tasks
-        ]
-
-    def restore_state(self, state):
-        # Restore tasks from state
-        self.tasks = [
-            Task(t.id, t.title, t.desc, t.x, t.y, t.completed, list(t.dependencies))
-            for t in state
-        ]
-        self.refresh_dots()
-        self.overlay.update()
-        self.save_data()
+    def snapshot_tasks(self):
+        return [t.to_dict() for t in self.tasks]
 
-    def push_undo(self, action_type, target_id=None):
-        current_state = self.get_state()
-        self.undo_stack.append({
-            'state': current_state,
-            'action': action_type,
-            'target_id': target_id
-        })
-        
-        # Cap the stack size to prevent memory bloat
-        if len(self.undo_stack) > 50:
-            self.undo_stack.pop(0)
-            
-        self.redo_stack.clear()
+    @traced('push_undo')
+    def push_undo(self, action_type, patches):
+        # patches describe what this action changes, see history.py
+        self.history.push(action_type, patches)
 
+    @traced('undo')
     def undo(self):
-        if not self.undo_stack:
-            return
-            
-        # Save current state to redo stack
-        current_state = self.get_state()
-        last_action = self.undo_stack.pop()
-        
-        self.redo_stack.append({
-            'state': current_state,
-            'action': last_action['action'],
-            'target_id': last_action['target_id']
-        })
-        
-        self.restore_state(last_action['state'])
+        patches = self.history.pop_undo()
+        if patches:
+            self.apply_patches(patches)
 
+    @traced('redo')
     def redo(self):
-        if not self.redo_stack:
+        patches = self.history.pop_redo()
+        if patches:
+            self.apply_patches(patches)
+
+    @traced('apply_patches')
+    def apply_patches(self, patches):
+        for p in patches:
+            self.apply_patch(p)
+        self.relayout_dirty()
+        self.flush_edge_damage()
+
+    def apply_patch(self, p):
+        # apply one history patch in place, touching only the widgets involved
+        op = p['op']
+        if op == 'replace':
+            self.tasks = [Task(**dict(t, dependencies=list(t['dependencies']))) for t in p['after']]
+            self.refresh_dots()
+            self.save_data()
+            return
+        if op == 'add':
+            task = Task(**dict(p['task'], dependencies=list(p['task']['dependencies'])))
+            self.insert_task(task, p['index'], p['refs'])
+            return
+        if op == 'delete':
+            self.remove_task(p['task']['id'])
             return
-            
-        # Save current state to undo stack
-        current_state = self.get_state()
-        next_action = self.redo_stack.pop()
-        
-        self.undo_stack.append({
-            'state': current_state,
-            'action': next_action['action'],
-            'target_id': next_action['target_id']
-        })
-        
-        self.restore_state(next_action['state'])
+
+        dot = self.dot_by_id.get(p['id'])
+        if dot is None:
+            return # task is no longer on the board
+        t = dot.task
+        if op == 'move':
+            t.x, t.y = p['after']
+            dot.update_position()
+            self.save_data(('move', t.id))
+        elif op == 'complete':
+            t.completed = p['after']
+            dot.update()
+            self.save_data(('complete', t.id))
+        elif op == 'edit':
+            label_cache.invalidate(t.title)
+            t.title, t.desc = p['after']
+            dot.update_position()
+            self.save_data(('edit', t.id))
+        elif op == 'link':
+            if p['dep'] in self.dot_by_id and self.graph.link(t.id, p['dep']):
+                self.link_added((p['dep'], t.id))
+                self.save_data(('link', t.id, p['dep']))
+        elif op == 'unlink':
+            if self.graph.unlink(t.id, p['dep']):
+                self.link_removed((p['dep'], t.id))
+                self.save_data(('unlink', t.id, p['dep']))
+
+    def insert_task(self, task, index, refs=()):
+        self.tasks.insert(min(index, len(self.tasks)), task)
+        self.graph.add_task(task)
+        self.add_dot_widget(task)
+        self.save_data(('add', task.id))
+        for dep_id in task.dependencies:
+            self.link_added((dep_id, task.id))
+        # restore the links other tasks had to it
+        for ref_id in refs:
+            if ref_id in self.dot_by_id and self.graph.link(ref_id, task.id):
+                self.link_added((task.id, ref_id))
+                self.save_data(('link', ref_id, task.id))
+
+    def remove_task(self, task_id):
+        self.tasks = [t for t in self.tasks if t.id != task_id]
+        self.graph.remove_task(task_id) # also drops it from its dependents' lists
+        dot = self.dot_by_id.pop(task_id, None)
+        if dot is not None:
+            self.release_dot(dot)
+            self.dots.remove(dot)
+        self.save_data(('delete', task_id))
+
+    def delete_patch(self, task):
+        refs = sorted(self.graph.dependents_of(task.id))
+        index = next((i for i, t in enumerate(self.tasks) if t.id == task.id), len(self.tasks))
+        return {'op': 'delete', 'task': task.to_dict(), 'index': index, 'refs': refs}
 
     def on_dot_drag_start(self, task_id):
-        self.push_undo('move', task_id)
+        task = self.dot_by_id[task_id].task
+        self.drag_origin = (task_id, task.x, task.y)
+
+    def on_dot_drag_end(self):
+        if self.drag_origin:
+            task_id, x, y = self.drag_origin
+            self.drag_origin = None
+            dot = self.dot_by_id.get(task_id)
+            if dot is not None and (dot.task.x, dot.task.y) != (x, y):
+                self.push_undo('move', [{'op': 'move', 'id': task_id,
+                                         'before': [x, y], 'after': [dot.task.x, dot.task.y]}])
+        # drag settled, persist the final position right away
+        self.flush_save()
 
     def on_link_started(self, dot):
         self.temp_link_start = dot
         self.temp_link_end = dot.get_dot_center()
-        self.overlay.update()
+        self.update_temp_link()
 
     def on_link_dragging(self, global_pos):
         self.temp_link_end = self.mapFromGlobal(global_pos)
-        self.overlay.update()
+        self.update_temp_link()
+
+    def update_temp_link(self):
+        # repaint only where the dragged link was and now is
+        if self.temp_link_geo is not None:
+            self.damage(self.temp_link_geo.bounds())
+        self.temp_link_geo = None
+        if self.temp_link_start and self.temp_link_end:
+            self.temp_link_geo = EdgeGeometry(self.temp_link_start.get_dot_center(), self.temp_link_end)
+            self.damage(self.temp_link_geo.bounds())
 
     def on_link_ended(self, global_pos):
         end_pos = self.mapFromGlobal(global_pos)
-        target = self.childAt(end_pos)
-        
-        # childAt might return the label or other parts, walk up to find TaskDot
-        while target and not isinstance(target, TaskDot):
-            target = target.parent()
+        target = self.dot_at(end_pos)
             
-        if target and isinstance(target, TaskDot) and target != self.temp_link_start:
-            self.push_undo('link')
+        if target is not None and target != self.temp_link_start:
             # toggle dependency
             start_id = self.temp_link_start.task.id
             target_id = target.task.id
             
-            if start_id in target.task.dependencies:
-                target.task.dependencies.remove(start_id)
-            else:
-                # prevent cycles? nah, let chaos reign (or maybe just simple check)
-                if target_id not in self.temp_link_start.task.dependencies:
-                    target.task.dependencies.append(start_id)
-            
-            self.save_data()
+            if self.graph.has_link(target_id, start_id):
+                self.push_undo('link', [{'op': 'unlink', 'id': target_id, 'dep': start_id}])
+                self.graph.unlink(target_id, start_id)
+                self.link_removed((start_id, target_id))
+                self.save_data(('unlink', target_id, start_id))
+            elif not self.graph.would_cycle(target_id, start_id):
+                # a link that would close a loop is refused
+                self.push_undo('link', [{'op': 'link', 'id': target_id, 'dep': start_id}])
+                self.graph.link(target_id, start_id)
+                self.link_added((start_id, target_id))
+                self.save_data(('link', target_id, start_id))
             
         self.temp_link_start = None
         self.temp_link_end = None
-        self.overlay.update()
+        self.update_temp_link()
+        self.flush_edge_damage()
 
-    def on_dot_moved(self):
-        # update all dots to resolve overlaps dynamically
-        for dot in self.dots:
-            dot.update_position()
-        self.overlay.update() # repaint lines
-        self.save_data()
+    def damage(self, rect):
+        self.overlay.update(rect.toAlignedRect())
+
+    def link_added(self, key):
+        self.edge_cache.mark_new(key)
+        self.edge_damage.add(key)
+
+    def link_removed(self, key):
+        geo = self.edge_cache.invalidate_edge(key)
+        if geo is not None:
+            self.damage(geo.bounds())
+        else:
+            self.overlay.update() # never drawn from the cache, don't know where it is
+
+    def links_moved(self, task_id):
+        # old geometry is repainted now, the new one once relayout settles
+        for key, geo in self.edge_cache.invalidate_task(task_id):
+            self.damage(geo.bounds())
+            self.edge_damage.add(key)
+
+    def flush_edge_damage(self):
+        # repaint the new geometry of links that changed, building it now
+        if not self.edge_cache.complete:
+            self.overlay.update() # links were never all drawn, nothing to compare against
+        else:
+            for key in self.edge_damage:
+                geo = self.build_edge(key)
+                if geo is not None:
+                    self.damage(geo.bounds())
+        self.edge_damage.clear()
+
+    @traced('relayout_dirty')
+    def relayout_dirty(self, skip=None):
+        # Re-place only dots whose candidate area touches a rect that changed.
+        # A re-placed dot that moves adds its own footprints, so the update
+        # spreads exactly as far as neighbours keep changing, nearest first.
+        # On a crowded board that can be every dot: past the frame slice the
+        # rest carries on from an idle timer, and the next edit starts over.
+        return self.run_relayout({skip} if skip is not None else set())
+
+    def run_relayout(self, visited):
+        deadline = time.perf_counter() + RenderConfig.RELAYOUT_SLICE_MS / 1000
+        relaid = 0
+        out_of_time = False
+        while self.dirty_footprints and not out_of_time:
+            rect = self.dirty_footprints.popleft()
+            for dot in self.reach_index.query(rect):
+                if dot in visited:
+                    continue
+                if time.perf_counter() > deadline:
+                    self.dirty_footprints.appendleft(rect) # the dots already done are skipped next time
+                    out_of_time = True
+                    break
+                visited.add(dot)
+                dot.update_position()
+                relaid += 1
+        if self.dirty_footprints:
+            self.relayout_seen = visited
+            self.relayout_rest.start()
+        else:
+            self.relayout_seen = set()
+            self.relayout_rest.stop()
+        self.last_relaid = relaid
+        return relaid
+
+    def continue_relayout(self):
+        self.run_relayout(self.relayout_seen)
+        self.flush_edge_damage()
+
+    def on_dot_moved(self, moved_dot):
+        # the moved dot placed itself already, resolve overlaps around it
+        start = time.perf_counter() if self.perf.enabled else None
+        relaid = self.relayout_dirty(skip=moved_dot)
+        if start is not None:
+            self.perf.record('relayout', start)
+            self.perf.add('relaid', relaid)
+        self.flush_edge_damage() # repaint lines that moved
+        self.save_data(('move', moved_dot.task.id))
+
+    def on_dot_toggled(self, dot):
+        done = dot.task.completed
+        self.push_undo('complete', [{'op': 'complete', 'id': dot.task.id, 'before': not done, 'after': done}])
+        self.save_data(('complete', dot.task.id))
 
     def add_new_task(self, x=0.5, y=0.5):
+        # dialogs and uuid are only needed once someone adds a task, keep them off the startup path
+        import uuid
+        from dialogs import NameInput
         # show input dialog
         dialog = NameInput(self)
         # center dialog on cursor or center of widget
@@ -291,50 +701,106 @@ class MatrixCanvas(QFrame):
             dialog.move(global_pos.x() - 100, global_pos.y() - 20)
             
         if dialog.exec() == QDialog.DialogCode.Accepted and dialog.input.text().strip():
-            self.push_undo('add')
             name = dialog.input.text().strip()
             new_task = Task(str(uuid.uuid4()), name, "", x, y)
-            self.tasks.append(new_task)
-            self.add_dot_widget(new_task)
-            self.save_data()
+            self.push_undo('add', [{'op': 'add', 'task': new_task.to_dict(), 'index': len(self.tasks), 'refs': []}])
+            self.insert_task(new_task, len(self.tasks))
+            self.flush_edge_damage()
+
+    def save_data(self, change=None):
+        # write-behind: mark dirty, the saver writes once edits go idle.
+        # change is a small key like ('move', id); None means the whole board changed
+        self.saver.mark_dirty(change)
+
+    def write_data(self, changes):
+        # the board is copied here, the worker writes the copy
+        start = time.perf_counter() if self.perf.enabled else None
+        self.io.save(self.tasks, changes)
+        if start is not None:
+            self.perf.record('save_prepare', start)
+
+    def flush_save(self):
+        self.saver.flush()
 
-    def save_data(self):
-        TaskManager.save_tasks(self.tasks)
+    def wait_for_io(self):
+        self.io.wait()
+
+    def discard_pending_save(self):
+        self.saver.discard()
 
     def show_details(self, dot_widget):
+        from dialogs import DetailPopup
         popup = DetailPopup(dot_widget.task, self)
         global_pos = dot_widget.mapToGlobal(QPoint(UiConfig.DOT_SIZE + 10, 0))
         popup.move(global_pos)
         popup.data_changed.connect(self.handle_task_change)
+        self.edit_before = (dot_widget.task.title, dot_widget.task.desc)
         popup.exec()
+        self.edit_before = None
 
     def handle_task_change(self, task, is_delete):
         if is_delete:
-            self.tasks = [t for t in self.tasks if t.id != task.id]
-            # clean up dependencies
-            for t in self.tasks:
-                if task.id in t.dependencies:
-                    t.dependencies.remove(task.id)
-            self.refresh_dots()
+            self.push_undo('delete', [self.delete_patch(task)])
+            self.remove_task(task.id)
+            self.relayout_dirty()
+            self.flush_edge_damage()
         else:
-            for dot in self.dots:
-                if dot.task.id == task.id:
-                    dot.update_position()
-                    break
-        self.save_data()
+            before = list(self.edit_before or (task.title, task.desc))
+            if before != [task.title, task.desc]:
+                self.push_undo('edit', [{'op': 'edit', 'id': task.id, 'before': before,
+                                         'after': [task.title, task.desc]}])
+            dot = self.dot_by_id.get(task.id)
+            if dot is not None:
+                dot.update_position()
+                self.flush_edge_damage()
+            self.save_data(('edit', task.id))
 
     def clear_all_tasks(self):
+        before = self.snapshot_tasks()
         self.tasks = []
         self.refresh_dots()
         self.save_data()
+        self.push_undo('clear', [{'op': 'replace', 'before': before, 'after': []}])
 
     def reload_tasks(self):
-        self.tasks = TaskManager.load_tasks()
-        self.refresh_dots()
+        self.flush_save() # queued ahead of the load, so it reads them back
+        if self.reload_before is None:
+            self.reload_before = self.snapshot_tasks()
+        self.load_seq = self.io.load()
 
+    @traced('MatrixCanvas.paintEvent')
     def paintEvent(self, event):
+        start = time.perf_counter() if self.perf.enabled else None
         super().paintEvent(event)
         painter = QPainter(self)
+        if self.bg_moving:
+            # the background follows the mouse, no point retaining a layer per event
+            painter.save()
+            self.paint_chrome(painter)
+            painter.restore()
+        else:
+            key = (self.width(), self.height(), self.radii, self.bg_offset.x(), self.bg_offset.y(),
+                   self.bg_scale, self.bg_opacity, self.bg_adjusting, UiConfig.QUAD_LINES_COLOR)
+            self.chrome.draw(painter, key, self.size(), self.devicePixelRatioF(), self.paint_chrome)
+        if self.batched:
+            self.paint_dots(painter, event.rect())
+        if start is not None:
+            painter.end()
+            self.perf.record('canvas_paint', start)
+
+    def paint_dots(self, painter, rect):
+        # every dot touching the repainted rect, bottom to top
+        for dot in sorted(self.dot_index.query(rect), key=lambda d: d.z):
+            if not dot.isVisible():
+                continue
+            geo = dot.geometry()
+            painter.save()
+            painter.translate(geo.topLeft())
+            painter.setClipRect(0, 0, geo.width(), geo.height()) # as a widget would be
+            dot.paint(painter)
+            painter.restore()
+
+    def paint_chrome(self, painter):
         painter.setRenderHint(QPainter.RenderHint.Antialiasing)
         
         w, h = self.width(), self.height()
@@ -365,14 +831,9 @@ class MatrixCanvas(QFrame):
             painter.setClipPath(path)
         
         # Draw background image if exists
-        if self.bg_pixmap and not self.bg_pixmap.isNull():
-            painter.save()
-            painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
-            painter.setOpacity(self.bg_opacity)
-            painter.translate(self.bg_offset)
-            painter.scale(self.bg_scale, self.bg_scale)
-            painter.drawPixmap(0, 0, self.bg_pixmap)
-            painter.restore()
+        # pre-scaled, cached copy; only rebuilt when the bg state or size changes
+        self.bg_layer.draw(painter, self.size(), self.devicePixelRatioF(), self.bg_offset,
+                           self.bg_scale, self.bg_opacity, fast=self.bg_moving)
         
         cx, cy = w // 2, h // 2
 
@@ -397,106 +858,67 @@ class MatrixCanvas(QFrame):
             painter.setPen(QColor("#a6da95"))
             painter.drawText(10, h - 10, "BG...")
 
-    def draw_dependencies(self, painter):
-        # map id to dot center
-        dot_map = {d.task.id: d for d in self.dots}
-        
+    def iter_edge_geometry(self):
+        # (from_id, to_id), geometry for every link whose both ends are on the board
+        for dot in self.dots:
+            for dep_id in dot.task.dependencies:
+                end_dot = self.dot_by_id.get(dep_id)
+                if end_dot is not None:
+                    key = (dep_id, dot.task.id)
+                    geo = self.edge_cache.peek(key)
+                    if geo is None:
+                        geo = self.edge_cache.get(key, end_dot.get_dot_center(), dot.get_dot_center())
+                    yield key, geo
+
+    def edge_at(self, pos):
+        # link under pos, testing only links whose bounds contain it
+        cache = self.edge_cache
+        if not cache.complete:
+            for _ in self.iter_edge_geometry(): pass
+            cache.complete = True
+        for key in list(cache.stale):
+            self.build_edge(key)
+
+        for key in cache.candidates_at(pos):
+            if cache.peek(key).hit_outline.contains(pos):
+                return key
+        return None
+
+    def build_edge(self, key):
+        # geometry for a link that may have changed, None if it is gone
+        dep_id, task_id = key
+        dot, end_dot = self.dot_by_id.get(task_id), self.dot_by_id.get(dep_id)
+        if dot is None or end_dot is None or not self.graph.has_link(task_id, dep_id):
+            self.edge_cache.stale.discard(key)
+            return None
+        return self.edge_cache.get(key, end_dot.get_dot_center(), dot.get_dot_center())
+
+    @traced('draw_dependencies')
+    def draw_dependencies(self, painter, rect=None):
         pen = QPen(QColor(UiConfig.ACCENT_COLOR))
         pen.setWidth(2)
         pen.setStyle(Qt.PenStyle.DashLine)
-        painter.setPen(pen)
-        painter.setBrush(Qt.BrushStyle.NoBrush)
+        accent = QColor(UiConfig.ACCENT_COLOR)
 
-        # draw existing links
-        for dot in self.dots:
-            start_center = dot.get_dot_center()
-            for dep_id in dot.task.dependencies:
-                if dep_id in dot_map:
-                    end_dot = dot_map[dep_id]
-                    end_center = end_dot.get_dot_center()
-                    self.draw_curved_arrow(painter, end_center, start_center)
+        # draw existing links, skipping those outside the repainted rect
+        for _, geo in self.iter_edge_geometry():
+            if rect is None or geo.bounds().intersects(rect):
+                self.draw_edge(painter, geo, pen, accent)
+        self.edge_cache.complete = True
 
         # draw temp link
-        if self.temp_link_start and self.temp_link_end:
-            start = self.temp_link_start.get_dot_center()
-            self.draw_curved_arrow(painter, start, self.temp_link_end)
+        if self.temp_link_geo is not None:
+            self.draw_edge(painter, self.temp_link_geo, pen, accent)
 
-    def get_arrow_path(self, start, end):
-        start = QPointF(start)
-        end = QPointF(end)
-        path = QPainterPath()
-        path.moveTo(start)
-        
-        dx = end.x() - start.x()
-        dy = end.y() - start.y()
-        
-        # control point for curve
-        ctrl = QPointF(start.x() + dx * 0.5, start.y())
-        path.quadTo(ctrl, end)
-        return path
-
-    def draw_curved_arrow(self, painter, start, end):
-        # Adjust start/end to stop at dot edge
-        start = QPointF(start)
-        end = QPointF(end)
-        
-        offset = UiConfig.DOT_SIZE / 2
-        
-        dx = end.x() - start.x()
-        dy = end.y() - start.y()
-        
-        # Adjust start (horizontal tangent)
-        if abs(dx) > 1:
-            start.setX(start.x() + (offset if dx > 0 else -offset))
-            
-        # Adjust end (tangent is end - ctrl)
-        # ctrl is (start.x + dx/2, start.y) -> tangent vector is (dx/2, dy)
-        t_vec = QPointF(dx * 0.5, dy)
-        t_len = math.sqrt(t_vec.x()**2 + t_vec.y()**2)
-        
-        if t_len > 0:
-            end = end - t_vec * (offset / t_len)
+    def draw_edge(self, painter, geo, pen, accent):
+        painter.setPen(pen)
+        painter.setBrush(Qt.BrushStyle.NoBrush)
+        painter.drawPath(geo.path)
 
-        path = self.get_arrow_path(start, end)
-        painter.drawPath(path)
-        
         # arrowhead
-        # calculate angle at end
-        # derivative of quad bezier at t=1 is 2(P2 - P1) where P1 is ctrl, P2 is end
-        
-        # Recalculate for new points
-        dx = end.x() - start.x()
-        ctrl = QPointF(start.x() + dx * 0.5, start.y())
-        
-        arrow_dx = end.x() - ctrl.x()
-        arrow_dy = end.y() - ctrl.y()
-        angle = math.atan2(arrow_dy, arrow_dx)
-        
-        arrow_len = 10
-        arrow_angle = math.pi / 6
-        
-        p1 = QPointF(end.x() - arrow_len * math.cos(angle - arrow_angle),
-                     end.y() - arrow_len * math.sin(angle - arrow_angle))
-        p2 = QPointF(end.x() - arrow_len * math.cos(angle + arrow_angle),
-                     end.y() - arrow_len * math.sin(angle + arrow_angle))
-        
-        painter.setBrush(QColor(UiConfig.ACCENT_COLOR))
+        painter.setBrush(accent)
         painter.setPen(Qt.PenStyle.NoPen)
-        
-        arrow_path = QPainterPath()
-        arrow_path.moveTo(end)
-        arrow_path.lineTo(p1)
-        arrow_path.lineTo(p2)
-        arrow_path.closeSubpath()
-        
-        painter.drawPath(arrow_path)
-        
-        # restore pen
-        pen = QPen(QColor(UiConfig.ACCENT_COLOR))
-        pen.setWidth(2)
-        pen.setStyle(Qt.PenStyle.DashLine)
-        painter.setPen(pen)
-        painter.setBrush(Qt.BrushStyle.NoBrush)
+        painter.drawPath(geo.head)
 
     def set_locked(self, locked: bool):
         self.locked = locked
@@ -510,9 +932,23 @@ class DependencyOverlay(QWidget):
         super().__init__(parent)
         self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
         self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
+        # debug: pixels covered by repaints (bounding rect of the dirty region)
+        self.last_painted_px = 0
+        self.painted_px = 0
+        self.paints = 0
 
+    @traced('DependencyOverlay.paintEvent')
     def paintEvent(self, event):
+        rect = event.rect()
+        self.last_painted_px = rect.width() * rect.height()
+        self.painted_px += self.last_painted_px
+        self.paints += 1
+        perf = getattr(self.parent(), 'perf', None)
+        start = time.perf_counter() if perf is not None and perf.enabled else None
         painter = QPainter(self)
         painter.setRenderHint(QPainter.RenderHint.Antialiasing)
         if self.parent():
-            self.parent().draw_dependencies(painter)
+            self.parent().draw_dependencies(painter, QRectF(rect))
+        if start is not None:
+            painter.end()
+            perf.record('links_paint', start)
@@ -1,9 +1,8 @@
-import json
-import os
-import shutil
-from pathlib import Path
-from dataclasses import dataclass, asdict, field
-from config import get_storage_dir
+import threading
+from dataclasses import dataclass, field
+from config import get_storage_dir, StorageConfig
+from storage import create_store, build_records, record_problem
+from tracing import traced
 
 @dataclass
 class Task:
@@ -16,81 +15,219 @@ class Task:
     dependencies: list[str] = field(default_factory=list)
     
     def to_dict(self):
-        return asdict(self)
+        # field by field: asdict() deep-copies generically and is many times slower,
+        # and saves copy the whole board with this on the GUI thread
+        return {'id': self.id, 'title': self.title, 'desc': self.desc, 'x': self.x, 'y': self.y,
+                'completed': self.completed, 'dependencies': list(self.dependencies)}
+
+class DependencyGraph:
+    # Forward (task -> ids it depends on) and reverse (task -> ids depending
+    # on it) adjacency sets for a board. Task.dependencies stays the ordered
+    # list that gets saved; links are only changed through here so the sets
+    # and the lists always agree.
+    def __init__(self, tasks=()):
+        self.tasks = {}      # id -> Task
+        self.deps = {}       # id -> set of ids it depends on
+        self.dependents = {} # id -> set of ids that depend on it
+        for task in tasks:
+            self.add_task(task)
+
+    def add_task(self, task):
+        self.tasks[task.id] = task
+        self.deps[task.id] = set(task.dependencies)
+        self.dependents.setdefault(task.id, set())
+        for dep_id in task.dependencies:
+            self.dependents.setdefault(dep_id, set()).add(task.id)
+
+    def remove_task(self, task_id):
+        # drops the task and every link to it; returns the ids that depended on it.
+        # The removed Task keeps its own dependency list, e.g. for an undo entry.
+        self.tasks.pop(task_id, None)
+        for dep_id in self.deps.pop(task_id, ()):
+            refs = self.dependents.get(dep_id)
+            if refs is not None:
+                refs.discard(task_id)
+        refs = self.dependents.pop(task_id, set())
+        for ref_id in refs:
+            self.deps[ref_id].discard(task_id)
+            ref = self.tasks[ref_id]
+            ref.dependencies = [d for d in ref.dependencies if d != task_id] # every copy of the link
+        return refs
+
+    def has_link(self, task_id, dep_id):
+        return dep_id in self.deps.get(task_id, ())
+
+    def dependents_of(self, task_id):
+        return self.dependents.get(task_id, set())
+
+    def link(self, task_id, dep_id):
+        # task_id now depends on dep_id; False if it already did
+        if self.has_link(task_id, dep_id):
+            return False
+        self.tasks[task_id].dependencies.append(dep_id)
+        self.deps[task_id].add(dep_id)
+        self.dependents.setdefault(dep_id, set()).add(task_id)
+        return True
+
+    def unlink(self, task_id, dep_id):
+        if not self.has_link(task_id, dep_id):
+            return False
+        task = self.tasks[task_id]
+        task.dependencies = [d for d in task.dependencies if d != dep_id] # every copy of the link
+        self.deps[task_id].discard(dep_id)
+        self.dependents[dep_id].discard(task_id)
+        return True
+
+    def would_cycle(self, task_id, dep_id):
+        # linking task -> dep closes a cycle iff task is already reachable from dep
+        if task_id == dep_id:
+            return True
+        seen = {dep_id}
+        stack = [dep_id]
+        while stack:
+            for next_id in self.deps.get(stack.pop(), ()):
+                if next_id == task_id:
+                    return True
+                if next_id not in seen:
+                    seen.add(next_id)
+                    stack.append(next_id)
+        return False
+
+class LoadError(Exception):
+    # the stored board could not be read; the message says why and where the file went
+    pass
 
 class TaskManager:
+    _store = None
+    _store_lock = threading.Lock()
+    load_problems = [] # what the last load had to skip, as readable lines
+
     @staticmethod
     def get_storage_path():
         return get_storage_dir() / "tasks.json"
 
     @staticmethod
+    def get_store():
+        with TaskManager._store_lock: # created once, whichever thread asks first
+            if TaskManager._store is None:
+                TaskManager._store = create_store(StorageConfig.BACKEND, TaskManager.get_storage_path(), StorageConfig)
+        return TaskManager._store
+
+    @staticmethod
+    @traced('load_tasks')
     def load_tasks():
-        file_path = TaskManager.get_storage_path()
-        if not file_path.exists():
-            return []
+        # Records are turned into Tasks as the store parses them; a broken
+        # one is skipped and reported instead of costing the whole board.
+        # Completed tasks may be pruned, they stay a plain tuple until that is
+        # decided. File errors are raised, the I/O worker reports them.
+        store = None
+        problems = []
+        tasks = {}     # id -> Task in board order, None for a completed task not decided yet
+        done = {}      # completed id -> (title, desc, x, y, dependencies)
+        with_deps = [] # ids that have dependencies, the only ones pruning looks at
         try:
-            with open(file_path, 'r') as f:
-                data = json.load(f)
-                all_tasks = [Task(**t) for t in data]
-                
-                # Create a map for easy lookup
-                task_map = {t.id: t for t in all_tasks}
-
-                # Remove dependencies where both sides are completed
-                for t in all_tasks:
-                    if t.completed:
-                        new_deps = []
-                        for dep_id in t.dependencies:
-                            dep_task = task_map.get(dep_id)
-                            # If dependency exists and is completed, remove it
-                            if dep_task and dep_task.completed:
-                                continue
-                            new_deps.append(dep_id)
-                        t.dependencies = new_deps
-                
-                # Identify tasks that are depended upon by others
-                depended_upon_ids = set()
-                for t in all_tasks:
-                    for dep_id in t.dependencies:
-                        depended_upon_ids.add(dep_id)
-
-                tasks_to_keep = []
-                for t in all_tasks:
-                    if not t.completed:
-                        tasks_to_keep.append(t)
-                    else:
-                        # Keep completed task if it is part of a dependency chain (in or out)
-                        has_outgoing = len(t.dependencies) > 0
-                        has_incoming = t.id in depended_upon_ids
-                        
-                        if has_outgoing or has_incoming:
-                            tasks_to_keep.append(t)
-                
-                # Clean up dependencies pointing to removed tasks
-                kept_ids = {t.id for t in tasks_to_keep}
-                for t in tasks_to_keep:
-                    t.dependencies = [d for d in t.dependencies if d in kept_ids]
-                    
-                return tasks_to_keep
-        except:
-            return []
+            store = TaskManager.get_store()
+            for i, rec in enumerate(store.load(problems)):
+                problem = record_problem(rec)
+                if problem is None and rec['id'] in tasks:
+                    problem = f"duplicate id {rec['id']!r}"
+                if problem is not None:
+                    problems.append(f"record {i}: {problem}")
+                    continue
+                task_id = rec['id']
+                deps = rec.get('dependencies', []) # freshly parsed, ours to keep
+                if rec.get('completed', False):
+                    tasks[task_id] = None
+                    done[task_id] = (rec['title'], rec['desc'], rec['x'], rec['y'], deps)
+                else:
+                    tasks[task_id] = Task(task_id, rec['title'], rec['desc'], rec['x'], rec['y'], False, deps)
+                if deps:
+                    with_deps.append(task_id)
+        except Exception as e:
+            # the file can't be read (to the end): nothing is loaded, and the
+            # canvas holds saves back so the file is not replaced by an empty board
+            message = str(e)
+            copy = TaskManager.keep_broken_copy(store)
+            if copy is not None:
+                message += f"\nthe file as it was is kept in {copy.name}"
+            raise LoadError(message) from e
+
+        # A link between two completed tasks is dropped, and a completed task
+        # goes unless a link to or from it stays. Links to tasks that are not
+        # there are dropped as well (but still keep a completed task).
+        stays = set() # completed ids that keep a link
+        for task_id in with_deps:
+            if task_id in done:
+                if any(d not in done for d in done[task_id][4]):
+                    stays.add(task_id)
+            else:
+                stays.update(d for d in tasks[task_id].dependencies if d in done)
+        for task_id in stays:
+            title, desc, x, y, deps = done[task_id]
+            tasks[task_id] = Task(task_id, title, desc, x, y, True, deps)
+
+        for task_id in with_deps:
+            t = tasks[task_id]
+            if t is None:
+                continue # pruned
+            if t.completed:
+                deps = [d for d in t.dependencies if d in tasks and d not in done]
+            else:
+                # a completed dependency stays, this link keeps it
+                deps = [d for d in t.dependencies if d in tasks]
+            if len(deps) != len(t.dependencies):
+                t.dependencies = deps
+        tasks_to_keep = [t for t in tasks.values() if t is not None]
+
+        TaskManager.load_problems = problems
+        if problems:
+            copy = TaskManager.keep_broken_copy(store)
+            if copy is not None:
+                problems.append(f"the file as it was is kept in {copy.name}")
+
+        pruned = len(tasks_to_keep) != len(tasks) or bool(problems)
+        store.on_loaded(tasks_to_keep, pruned) # stores that write convert what they write
+        return tasks_to_keep
+
+    @staticmethod
+    def keep_broken_copy(store):
+        if store is None:
+            return None
+        try:
+            return store.keep_broken_copy()
+        except OSError:
+            return None # e.g. the file is not readable at all
+
+    @staticmethod
+    @traced('save_tasks')
+    def save_tasks(tasks, changes=None):
+        TaskManager.write_prepared(TaskManager.prepare_save(tasks, changes))
+
+    @staticmethod
+    @traced('prepare_save')
+    def prepare_save(tasks, changes=None):
+        # changes: edit keys collected since the last save, None means "everything".
+        # Copies out everything the write needs, so it can run on another thread
+        # while the board keeps changing.
+        store = TaskManager.get_store()
+        if changes is not None and store.supports_records:
+            return ('records', build_records(tasks, changes))
+        return ('snapshot', [t.to_dict() for t in tasks])
 
     @staticmethod
-    def save_tasks(tasks):
-        file_path = TaskManager.get_storage_path()
-        with open(file_path, 'w') as f:
-            json.dump([t.to_dict() for t in tasks], f, indent=4)
+    @traced('write_prepared')
+    def write_prepared(payload):
+        kind, data = payload
+        store = TaskManager.get_store()
+        if kind == 'records':
+            store.append(data)
+        else:
+            store.write_snapshot(data)
 
     @staticmethod
     def create_backup():
-        path = TaskManager.get_storage_path()
-        if path.exists():
-            backup_path = path.with_suffix(".bak")
-            shutil.copy2(path, backup_path)
+        TaskManager.get_store().create_backup()
 
     @staticmethod
     def restore_backup():
-        path = TaskManager.get_storage_path()
-        backup_path = path.with_suffix(".bak")
-        if backup_path.exists():
-            shutil.copy2(backup_path, path)
+        TaskManager.get_store().restore_backup()
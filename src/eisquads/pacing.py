@@ -0,0 +1,60 @@
+import time
+from PyQt6.QtCore import Qt, QObject, QTimer
+from PyQt6.QtGui import QGuiApplication
+
+class FramePacer(QObject):
+    # Runs pending work at most once per display frame. Work posted under a
+    # key that is still waiting replaces it, so a burst of mouse moves from a
+    # high polling rate mouse becomes one layout pass with the latest position.
+    # The first post after a quiet frame runs right away, so pacing adds no
+    # latency to slow moves.
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pending = {} # key -> callable, in posting order
+        self.interval = None # ms per frame, read from the screen on first use
+        self.last_run = 0.0
+        self.frames = 0
+        self.coalesced = 0 # posts replaced before they ran
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.timeout.connect(self.run)
+
+    def frame_ms(self):
+        if self.interval is None:
+            screen = QGuiApplication.primaryScreen()
+            rate = screen.refreshRate() if screen is not None else 0
+            self.interval = 1000 / rate if rate > 0 else 1000 / 60
+        return self.interval
+
+    def post(self, key, fn):
+        if key in self.pending:
+            self.coalesced += 1
+            del self.pending[key]
+        self.pending[key] = fn
+        if self.timer.isActive():
+            return
+        wait = self.last_run + self.frame_ms() - time.perf_counter() * 1000
+        if wait <= 0:
+            self.run()
+        else:
+            self.timer.start(max(1, round(wait)))
+
+    def run(self):
+        self.timer.stop()
+        pending, self.pending = self.pending, {}
+        self.last_run = time.perf_counter() * 1000
+        if pending:
+            self.frames += 1
+        for fn in pending.values():
+            fn()
+
+    def flush(self, key):
+        # run one key's pending work now, e.g. on release before the final position is used
+        fn = self.pending.pop(key, None)
+        if fn is not None:
+            fn()
+
+    def discard(self, key):
+        self.pending.pop(key, None)
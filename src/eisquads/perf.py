@@ -0,0 +1,116 @@
+import time
+from collections import deque
+from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtGui import QColor, QFont, QFontMetrics, QPainter
+from PyQt6.QtWidgets import QWidget
+from config import UiConfig, PerfConfig
+
+class RollingStats:
+    # the last N samples of one measurement, for p50/p95/max
+    def __init__(self, size=PerfConfig.SAMPLES):
+        self.samples = deque(maxlen=size)
+        self.count = 0
+
+    def add(self, value):
+        self.samples.append(value)
+        self.count += 1
+
+    def summary(self):
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        n = len(ordered)
+        return ordered[n // 2], ordered[min(n - 1, int(n * 0.95))], ordered[-1]
+
+class PerfMonitor:
+    # Timings for the perf HUD. Off by default; call sites check `enabled`
+    # before reading the clock, so an idle monitor costs one attribute read.
+    def __init__(self):
+        self.enabled = False
+        self.stats = {}
+
+    def record(self, name, start):
+        # start is a perf_counter() taken when the measured work began
+        self.add(name, (time.perf_counter() - start) * 1000)
+
+    def add(self, name, value):
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = RollingStats()
+        stats.add(value)
+
+    def reset(self):
+        self.stats.clear()
+
+# (stat name, label) in HUD order, all in ms but the relaid count
+HUD_ROWS = [
+    ('canvas_paint', "paint"),
+    ('links_paint', "links"),
+    ('update_position', "drag"),
+    ('relayout', "relayout"),
+    ('relaid', "relaid #"),
+    ('save_prepare', "save copy"),
+    ('save_write', "save write"),
+]
+
+class PerfHud(QWidget):
+    # Live p50/p95/max of the canvas' PerfMonitor, drawn over the board.
+    # It only repaints on its own timer, so it barely shows up in what it measures.
+    def __init__(self, canvas):
+        super().__init__(canvas)
+        self.canvas = canvas
+        self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+        self.hud_font = QFont("Consolas", 8)
+        self.hud_font.setStyleHint(QFont.StyleHint.Monospace)
+        self.timer = QTimer(self)
+        self.timer.setInterval(PerfConfig.HUD_REFRESH_MS)
+        self.timer.timeout.connect(self.refresh)
+
+    def lines(self):
+        perf = self.canvas.perf
+        out = [f"{'ms':<10}{'p50':>6}{'p95':>6}{'max':>6}"]
+        for name, label in HUD_ROWS:
+            summary = perf.stats.get(name)
+            summary = summary.summary() if summary is not None else None
+            if summary is None:
+                out.append(f"{label:<10}{'-':>6}")
+                continue
+            fmt = "{:>6.0f}" if name == 'relaid' else "{:>6.1f}"
+            out.append(f"{label:<10}" + "".join(fmt.format(v) for v in summary))
+        history = self.canvas.history
+        log_kib = history.log.size / 1024 if history.log is not None else 0
+        out.append(f"undo {history.memory_bytes() / 1024:.0f} KiB, log {log_kib:.0f} KiB")
+        out.append(f"{len(self.canvas.dots)} dots, {self.canvas.overlay.last_painted_px} px links")
+        pacer = self.canvas.pacer
+        if pacer is not None:
+            out.append(f"drag frames {pacer.frames}, coalesced {pacer.coalesced}")
+        return out
+
+    def refresh(self):
+        lines = self.lines()
+        fm = QFontMetrics(self.hud_font)
+        width = max(fm.horizontalAdvance(line) for line in lines) + 12
+        self.setGeometry(6, 6, width, fm.height() * len(lines) + 10)
+        self.raise_()
+        self.update()
+
+    def start(self):
+        self.refresh()
+        self.show()
+        self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
+        self.hide()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(QColor(0, 0, 0, 170))
+        painter.drawRoundedRect(self.rect(), 4, 4)
+        painter.setFont(self.hud_font)
+        painter.setPen(QColor(UiConfig.TEXT_COLOR))
+        fm = painter.fontMetrics()
+        for i, line in enumerate(self.lines()):
+            painter.drawText(6, 5 + fm.ascent() + i * fm.height(), line)
@@ -0,0 +1,148 @@
+import queue
+import threading
+import time
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from config import StorageConfig
+from models import TaskManager
+
+class WriteBehindSaver(QObject):
+    # Collects save requests and writes once the board goes idle.
+    # A drag emits dozens of changes per second; only the last state matters.
+    def __init__(self, write_fn, delay_ms=StorageConfig.SAVE_DEBOUNCE_MS, parent=None):
+        super().__init__(parent)
+        self.write_fn = write_fn
+        self.dirty = False
+        self.full = False   # something changed that has no change key, write everything
+        self.changes = {}   # change key -> None, insertion ordered, re-edits move to the end
+        self.blocked = False # nothing is written while set, e.g. the board failed to load
+        self.writes_issued = 0
+        self.writes_coalesced = 0
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay_ms)
+        self.timer.timeout.connect(self.flush)
+
+    def mark_dirty(self, change=None):
+        if self.dirty:
+            # folded into the write that is already pending
+            self.writes_coalesced += 1
+        self.dirty = True
+        if change is None:
+            self.full = True
+            self.changes.clear()
+        elif not self.full:
+            self.changes.pop(change, None)
+            self.changes[change] = None
+        self.timer.start() # (re)start the idle countdown
+
+    def flush(self):
+        self.timer.stop()
+        if not self.dirty or self.blocked:
+            return
+        changes = None if self.full else list(self.changes)
+        self.dirty = False
+        self.full = False
+        self.changes = {}
+        self.write_fn(changes)
+        self.writes_issued += 1
+
+    def retry(self):
+        # a write did not reach the disk: the next flush writes the whole board
+        # again. No timer, a disk that keeps failing is retried on the next edit.
+        self.dirty = True
+        self.full = True
+        self.changes = {}
+
+    def discard(self):
+        # drop pending changes, e.g. before the file is replaced by a backup
+        self.timer.stop()
+        self.dirty = False
+        self.full = False
+        self.changes = {}
+
+    def stats(self):
+        return {
+            'writes_issued': self.writes_issued,
+            'writes_coalesced': self.writes_coalesced,
+            'pending': self.dirty,
+        }
+
+class IoWorker(QObject):
+    # Runs every TaskManager file operation on one background thread, in the
+    # order they were asked for, so an older save can never land after a newer
+    # one. Saves take a copy of the board on the GUI thread first; results and
+    # errors come back as signals (queued onto the GUI thread by Qt).
+    loaded = pyqtSignal(int, object) # seq, list of Task
+    skipped = pyqtSignal(int, str) # seq, records a load had to leave out
+    saved = pyqtSignal(int, float) # seq, ms spent writing
+    failed = pyqtSignal(int, str, str) # seq, op, error
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.jobs = queue.Queue()
+        self.seq = 0 # last job handed out
+        self.finished = 0 # last job that ran, guarded by `ran`
+        self.ran = threading.Condition()
+        self.last_loaded = None # (seq, tasks) of the newest load that worked
+        try:
+            # the store is made here, before the worker exists, so the GUI
+            # thread (prepare_save) and the worker never both create one
+            TaskManager.get_store()
+        except Exception:
+            pass # e.g. a broken sqlite file; the load that follows reports it
+        self.thread = threading.Thread(target=self._run, name="eisquads-io", daemon=True)
+        self.thread.start()
+
+    def _submit(self, op, fn):
+        self.seq += 1
+        self.jobs.put((self.seq, op, fn))
+        return self.seq
+
+    def load(self):
+        return self._submit('load', TaskManager.load_tasks)
+
+    def save(self, tasks, changes=None):
+        payload = TaskManager.prepare_save(tasks, changes)
+        return self._submit('save', lambda: TaskManager.write_prepared(payload))
+
+    def create_backup(self):
+        return self._submit('backup', TaskManager.create_backup)
+
+    def restore_backup(self):
+        return self._submit('restore', TaskManager.restore_backup)
+
+    def write_history(self, fn):
+        # history.log writes, see HistoryLog
+        return self._submit('history', fn)
+
+    def wait(self):
+        # block until everything submitted so far is on disk, e.g. before quitting
+        self.jobs.join()
+
+    def wait_for(self, seq):
+        # block until job seq has run; jobs queued after it may still be going
+        with self.ran:
+            self.ran.wait_for(lambda: self.finished >= seq)
+
+    def _run(self):
+        while True:
+            seq, op, fn = self.jobs.get()
+            try:
+                start = time.perf_counter()
+                result = fn()
+                if op == 'load':
+                    self.last_loaded = (seq, result)
+                    self.loaded.emit(seq, result)
+                    if TaskManager.load_problems:
+                        # the board did load, minus the records listed
+                        self.skipped.emit(seq, "\n".join(TaskManager.load_problems))
+                elif op == 'save':
+                    self.saved.emit(seq, (time.perf_counter() - start) * 1000)
+            except Exception as e:
+                self.failed.emit(seq, op, str(e))
+            finally:
+                with self.ran:
+                    self.finished = seq
+                    self.ran.notify_all()
+                self.jobs.task_done()
@@ -0,0 +1,76 @@
+import math
+
+class GridIndex:
+    # Uniform grid over canvas coordinates. Each key is binned into every cell
+    # its rect touches, so a query only looks at keys in the cells it covers.
+    # Rects can be QRect or QRectF; the index keeps whatever it was given.
+    def __init__(self, cell_size=64):
+        self.cell_size = cell_size
+        self.cells = {}   # (cx, cy) -> {key: None}, dicts keep results in insertion order
+        self.rects = {}   # key -> rect
+
+    def __len__(self):
+        return len(self.rects)
+
+    def __contains__(self, key):
+        return key in self.rects
+
+    def _cell_range(self, rect):
+        cs = self.cell_size
+        x0 = math.floor(rect.left() / cs)
+        y0 = math.floor(rect.top() / cs)
+        x1 = math.floor((rect.left() + rect.width()) / cs)
+        y1 = math.floor((rect.top() + rect.height()) / cs)
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                yield (cx, cy)
+
+    def insert(self, key, rect):
+        self.remove(key)
+        self.rects[key] = rect
+        for cell in self._cell_range(rect):
+            self.cells.setdefault(cell, {})[key] = None
+
+    def remove(self, key):
+        rect = self.rects.pop(key, None)
+        if rect is None:
+            return None
+        for cell in self._cell_range(rect):
+            bucket = self.cells.get(cell)
+            if bucket is not None:
+                bucket.pop(key, None)
+                if not bucket:
+                    del self.cells[cell]
+        return rect
+
+    def update(self, key, rect):
+        # returns the previous rect (or None), callers use it as the old footprint
+        old = self.rects.get(key)
+        if old is not None and old == rect:
+            return old
+        self.insert(key, rect)
+        return old
+
+    def get(self, key):
+        return self.rects.get(key)
+
+    def query(self, rect):
+        # keys whose rect intersects `rect`
+        found = {}
+        for cell in self._cell_range(rect):
+            bucket = self.cells.get(cell)
+            if bucket:
+                found.update(bucket)
+        return [k for k in found if self.rects[k].intersects(rect)]
+
+    def query_point(self, x, y):
+        cs = self.cell_size
+        bucket = self.cells.get((math.floor(x / cs), math.floor(y / cs)), {})
+        return [k for k in bucket if _contains(self.rects[k], x, y)]
+
+    def clear(self):
+        self.cells.clear()
+        self.rects.clear()
+
+def _contains(rect, x, y):
+    return rect.left() <= x <= rect.left() + rect.width() and rect.top() <= y <= rect.top() + rect.height()
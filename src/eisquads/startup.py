@@ -0,0 +1,98 @@
+import builtins
+import sys
+import threading
+import time
+from config import StartupConfig, get_storage_dir
+
+T0 = time.perf_counter()
+milestones = [] # (name, ms since this module was imported)
+
+def mark(name):
+    ms = (time.perf_counter() - T0) * 1000
+    milestones.append((name, ms))
+    if StartupConfig.LOG:
+        print(f"[startup] {ms:8.1f} ms  {name}", file=sys.stderr)
+
+# --- startup profile ---
+# -X importtime is not available in the frozen exe, so imports are timed by
+# wrapping __import__ until the first paint, then the wrapper is taken out again.
+
+imports = {} # module -> (inclusive ms, self ms), first load only
+_stack = []  # inclusive ms of the children of each import in progress
+_real_import = None
+_main_thread = threading.get_ident()
+
+def _module_name(name, globals, level):
+    if not level:
+        return name
+    package = (globals or {}).get('__package__') or ''
+    parts = package.split('.')
+    base = '.'.join(parts[:len(parts) - level + 1])
+    return f"{base}.{name}" if name else base
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    key = _module_name(name, globals, level)
+    if key in sys.modules or threading.get_ident() != _main_thread:
+        return _real_import(name, globals, locals, fromlist, level)
+    _stack.append(0.0)
+    t = time.perf_counter()
+    try:
+        return _real_import(name, globals, locals, fromlist, level)
+    finally:
+        ms = (time.perf_counter() - t) * 1000
+        children = _stack.pop()
+        if _stack:
+            _stack[-1] += ms
+        imports.setdefault(key, (ms, ms - children))
+
+def profile_imports():
+    global _real_import
+    if not StartupConfig.PROFILE or _real_import is not None:
+        return
+    _real_import = builtins.__import__
+    builtins.__import__ = _timed_import
+
+def _stop_import_timer():
+    global _real_import
+    if _real_import is not None:
+        builtins.__import__ = _real_import
+        _real_import = None
+
+def watch_first_paint(app):
+    # marks the first paint of any widget, then writes the report
+    if not StartupConfig.PROFILE:
+        return
+    from PyQt6.QtCore import QObject, QEvent, QTimer
+
+    class FirstPaint(QObject):
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Type.Paint:
+                mark("first paint")
+                app.removeEventFilter(self)
+                QTimer.singleShot(0, write_profile) # after the paint itself
+            return False
+
+    app._first_paint = FirstPaint(app)
+    app.installEventFilter(app._first_paint)
+
+def profile_report(top=25):
+    lines = ["startup profile, ms since startup.py was imported", "", "milestones:"]
+    for name, ms in milestones:
+        lines.append(f"  {ms:9.1f}  {name}")
+    total = sum(self_ms for _, self_ms in imports.values())
+    lines += ["", f"imports: {len(imports)} modules, {total:.1f} ms", "  self ms   incl ms  module"]
+    slowest = sorted(imports.items(), key=lambda kv: kv[1][1], reverse=True)[:top]
+    for name, (incl, self_ms) in slowest:
+        lines.append(f"  {self_ms:7.1f}  {incl:8.1f}  {name}")
+    return "\n".join(lines) + "\n"
+
+def write_profile():
+    _stop_import_timer()
+    report = profile_report()
+    print(report, file=sys.stderr)
+    try:
+        storage_dir = get_storage_dir()
+        storage_dir.mkdir(parents=True, exist_ok=True)
+        (storage_dir / "startup_profile.txt").write_text(report, encoding='utf-8')
+    except OSError as e:
+        print(f"Could not write startup profile: {e}", file=sys.stderr)
@@ -0,0 +1,558 @@
+import filecmp
+import json
+import os
+import re
+import shutil
+import threading
+import time
+
+# --- change records ---
+# The canvas reports edits as small keys, e.g. ('move', task_id) or
+# ('link', task_id, dep_id). They are turned into records at save time, so a
+# burst of moves of the same task ends up as a single record.
+
+def build_records(tasks, changes):
+    task_map = {t.id: t for t in tasks}
+    records = []
+    for change in changes:
+        op, task_id = change[0], change[1]
+        t = task_map.get(task_id)
+        if op == 'delete':
+            records.append({'op': 'delete', 'id': task_id})
+        elif op in ('link', 'unlink'):
+            records.append({'op': op, 'id': task_id, 'dep': change[2]})
+        elif t is None:
+            continue # task was deleted after the edit, nothing left to record
+        elif op == 'add':
+            records.append({'op': 'add', 'task': t.to_dict()})
+        elif op == 'move':
+            records.append({'op': 'move', 'id': t.id, 'x': t.x, 'y': t.y})
+        elif op == 'complete':
+            records.append({'op': 'complete', 'id': t.id, 'completed': t.completed})
+        elif op == 'edit':
+            records.append({'op': 'edit', 'id': t.id, 'title': t.title, 'desc': t.desc})
+    return records
+
+def apply_record(task_map, rec):
+    # task_map: id -> task dict, in board order. Every op is idempotent so a
+    # journal that was already folded into the snapshot can be replayed again.
+    op = rec.get('op')
+    if op == 'add':
+        task_map[rec['task']['id']] = dict(rec['task'])
+        return
+    if op == 'delete':
+        task_map.pop(rec['id'], None)
+        for t in task_map.values():
+            if rec['id'] in t['dependencies']:
+                t['dependencies'].remove(rec['id'])
+        return
+
+    t = task_map.get(rec.get('id'))
+    if t is None:
+        return
+    if op == 'move':
+        t['x'], t['y'] = rec['x'], rec['y']
+    elif op == 'complete':
+        t['completed'] = rec['completed']
+    elif op == 'edit':
+        t['title'], t['desc'] = rec['title'], rec['desc']
+    elif op == 'link':
+        if rec['dep'] not in t['dependencies']:
+            t['dependencies'].append(rec['dep'])
+    elif op == 'unlink':
+        if rec['dep'] in t['dependencies']:
+            t['dependencies'].remove(rec['dep'])
+
+# --- reading ---
+
+_WS = re.compile(r'\s*')
+_SEPARATOR = re.compile(r'\s*,\s*')
+# Where to pick up again after a broken record: a '{' that opens a line.
+# The boards we write (indent=4) only have a record's own opening brace
+# there, as task records hold no nested objects and json escapes newlines
+# inside strings. A file on one line has no such point, so everything after
+# a broken record in it is lost.
+_RECORD_START = re.compile(r'\n\s*\{')
+
+def iter_json_array(f, problems, chunk_size=1 << 16, max_record=1 << 20):
+    # Yields the elements of a top-level json list one by one, reading the
+    # file in chunks, so neither the whole text nor the whole parsed list is
+    # held at once. An element that does not parse is reported in `problems`
+    # (with its offset) and skipped by resyncing at the next line opening a
+    # record, see _RECORD_START.
+    decoder = json.JSONDecoder()
+    buf, base, pos, eof = "", 0, 0, False # base: file offset of buf[0], in characters
+
+    def more():
+        nonlocal buf, base, pos, eof
+        data = "" if eof else f.read(chunk_size)
+        if not data:
+            eof = True
+            return False
+        buf, base, pos = buf[pos:] + data, base + pos, 0
+        return True
+
+    def peek():
+        # next non-whitespace character, '' at the end of the file
+        nonlocal pos
+        while True:
+            pos = _WS.match(buf, pos).end()
+            if pos < len(buf) or not more():
+                return buf[pos:pos + 1]
+
+    def resync():
+        nonlocal pos
+        while True:
+            m = _RECORD_START.search(buf, pos + 1)
+            if m is not None:
+                pos = m.end() - 1
+                return True
+            if not more():
+                return False
+
+    first = peek()
+    if first != '[':
+        if first:
+            problems.append(f"offset {base + pos}: not a json list")
+        return
+    pos += 1
+    expect_comma = False
+    broken = object()
+    while True:
+        sep = _SEPARATOR.match(buf, pos) if expect_comma else None
+        if sep is not None and sep.end() < len(buf):
+            pos = sep.end() # the usual case: a comma, then the next record
+        else:
+            c = peek()
+            if c == ']':
+                return
+            if not c:
+                problems.append(f"offset {base + pos}: file ends before the list is closed")
+                return
+            if expect_comma:
+                if c != ',':
+                    problems.append(f"offset {base + pos}: expected ',' between records")
+                    # only the comma is missing when a record starts right here
+                    if c != '{' and not resync():
+                        return
+                else:
+                    pos += 1
+                    peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+                break
+            except ValueError as e:
+                # the record may just be cut off at the end of the buffer
+                if len(buf) - pos < max_record and more():
+                    continue
+                problems.append(f"offset {base + pos}: {e.msg}")
+                value = broken
+                break
+        if value is broken:
+            if not resync():
+                return
+            expect_comma = False
+            continue
+        pos = end
+        expect_comma = True
+        yield value
+
+# keys a stored task needs, and their types; anything else in a record is ignored
+TASK_FIELDS = {'id': str, 'title': str, 'desc': str, 'x': (int, float), 'y': (int, float)}
+_NUMBER = (int, float)
+
+def record_problem(rec):
+    # what keeps one stored task from loading, None if nothing. Parsed records
+    # only hold exact types, so a good one passes a few type() checks.
+    try:
+        if (type(rec['id']) is str and type(rec['title']) is str and type(rec['desc']) is str
+                and type(rec['x']) in _NUMBER and type(rec['y']) in _NUMBER
+                and type(rec.get('completed', False)) is bool):
+            deps = rec.get('dependencies', [])
+            if type(deps) is list and (not deps or all(type(d) is str for d in deps)):
+                return None
+    except (KeyError, TypeError):
+        pass
+    return describe_problem(rec)
+
+def describe_problem(rec):
+    if not isinstance(rec, dict):
+        return "record is not an object"
+    for key, kind in TASK_FIELDS.items():
+        if key not in rec:
+            return f"missing '{key}'"
+        if not isinstance(rec[key], kind) or isinstance(rec[key], bool):
+            return f"'{key}' has the wrong type"
+    if not isinstance(rec.get('completed', False), bool):
+        return "'completed' is not true/false"
+    deps = rec.get('dependencies', [])
+    if not isinstance(deps, list) or not all(isinstance(d, str) for d in deps):
+        return "'dependencies' is not a list of ids"
+    return None
+
+def write_json_atomic(path, data, indent=4):
+    # write next to the target and swap in, a crash never leaves half a file
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, 'w') as f:
+        json.dump(data, f, indent=indent)
+    os.replace(tmp, path)
+
+# --- backends ---
+
+class JsonStore:
+    # the original format: one json list, rewritten on every save
+    name = 'json'
+    supports_records = False
+
+    def __init__(self, path):
+        self.path = path
+
+    @property
+    def backup_path(self):
+        return self.path.with_suffix(".bak")
+
+    def load(self, problems=None):
+        # a generator: records are parsed as they are consumed
+        if problems is None:
+            problems = []
+        if not self.path.exists():
+            return
+        with open(self.path, 'r') as f: # same encoding the saves use
+            yield from iter_json_array(f, problems)
+
+    def keep_broken_copy(self):
+        # the file had records that could not be loaded; copy it aside before a save replaces it
+        if not self.path.exists():
+            return None
+        # the same broken file loaded again (a reload, a restart without saving) keeps its first copy
+        copies = sorted(self.path.parent.glob(f"{self.path.stem}.broken-*{self.path.suffix}"))
+        if copies and filecmp.cmp(self.path, copies[-1], shallow=False):
+            return copies[-1]
+        dest = self.path.with_name(time.strftime(f"{self.path.stem}.broken-%Y%m%d-%H%M%S{self.path.suffix}"))
+        shutil.copy2(self.path, dest)
+        return dest
+
+    def write_snapshot(self, task_dicts):
+        with open(self.path, 'w') as f:
+            json.dump(task_dicts, f, indent=4)
+
+    def on_loaded(self, kept_tasks, pruned):
+        # tasks.json is only rewritten by the next save
+        pass
+
+    def create_backup(self):
+        if self.path.exists():
+            shutil.copy2(self.path, self.backup_path)
+
+    def restore_backup(self):
+        if self.backup_path.exists():
+            shutil.copy2(self.backup_path, self.path)
+
+class JournalStore(JsonStore):
+    # tasks.json holds a snapshot, tasks.journal the records appended since.
+    # Once the journal grows past the threshold it is rotated to
+    # tasks.journal.old and folded into a new snapshot on a background thread.
+    name = 'journal'
+    supports_records = True
+
+    def __init__(self, path, compact_bytes):
+        super().__init__(path)
+        self.journal_path = path.with_suffix(".journal")
+        self.old_journal_path = path.with_suffix(".journal.old")
+        self.compact_bytes = compact_bytes
+        self.lock = threading.Lock()
+        self.generation = 0 # bumped by full snapshot writes, stale compactions bail out
+        self.compactor = None
+        self.compactions = 0
+        self.replayed = 0
+
+    def _read_journal(self, path, task_map):
+        if not path.exists():
+            return 0
+        count = 0
+        with open(path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    break # torn tail from a crash mid-append, the rest is unusable
+                apply_record(task_map, rec)
+                count += 1
+        return count
+
+    def _fold(self, journal_paths, problems=None):
+        if problems is None:
+            problems = []
+        task_map = {}
+        for t in super().load(problems):
+            if isinstance(t, dict) and isinstance(t.get('id'), str):
+                task_map[t['id']] = t
+            else:
+                problems.append("record without an id skipped")
+        replayed = 0
+        for p in journal_paths:
+            replayed += self._read_journal(p, task_map)
+        return list(task_map.values()), replayed
+
+    def load(self, problems=None):
+        with self.lock:
+            data, self.replayed = self._fold([self.old_journal_path, self.journal_path], problems)
+        return data
+
+    def journal_size(self):
+        size = 0
+        for p in (self.old_journal_path, self.journal_path):
+            if p.exists():
+                size += p.stat().st_size
+        return size
+
+    def on_loaded(self, kept_tasks, pruned):
+        # startup already paid O(board) to parse, so start from a clean snapshot
+        if pruned or self.replayed:
+            self.write_snapshot([t.to_dict() for t in kept_tasks])
+
+    def write_snapshot(self, task_dicts):
+        with self.lock:
+            self.generation += 1
+            write_json_atomic(self.path, task_dicts)
+            for p in (self.journal_path, self.old_journal_path):
+                if p.exists():
+                    p.unlink()
+
+    def append(self, records):
+        if not records:
+            return
+        payload = "".join(json.dumps(r, separators=(',', ':')) + "\n" for r in records)
+        with self.lock:
+            with open(self.journal_path, 'a') as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            size = self.journal_path.stat().st_size
+        if size >= self.compact_bytes:
+            self.compact_async()
+
+    def compact_async(self):
+        if self.compactor and self.compactor.is_alive():
+            return
+        self.compactor = threading.Thread(target=self.compact, daemon=True)
+        self.compactor.start()
+
+    def compact(self):
+        with self.lock:
+            gen = self.generation
+            if self.journal_path.exists():
+                if self.old_journal_path.exists():
+                    # leftover from an interrupted compaction, keep both in order
+                    with open(self.old_journal_path, 'a') as dst, open(self.journal_path, 'r') as src:
+                        shutil.copyfileobj(src, dst)
+                    self.journal_path.unlink()
+                else:
+                    os.replace(self.journal_path, self.old_journal_path)
+            elif not self.old_journal_path.exists():
+                return
+
+        # the expensive part runs without the lock, appends keep going to a fresh journal
+        data, _ = self._fold([self.old_journal_path])
+        tmp = self.path.with_name(self.path.name + ".compact")
+        with open(tmp, 'w') as f:
+            json.dump(data, f, indent=4)
+
+        with self.lock:
+            if gen != self.generation:
+                # a full snapshot was written meanwhile and already covers this
+                tmp.unlink()
+                return
+            os.replace(tmp, self.path)
+            if self.old_journal_path.exists():
+                self.old_journal_path.unlink()
+            self.compactions += 1
+
+    def wait_for_compaction(self, timeout=None):
+        if self.compactor:
+            self.compactor.join(timeout)
+
+    def create_backup(self):
+        if self.journal_size() == 0:
+            super().create_backup()
+            return
+        with self.lock:
+            data, _ = self._fold([self.old_journal_path, self.journal_path])
+        write_json_atomic(self.backup_path, data)
+
+    def restore_backup(self):
+        if not self.backup_path.exists():
+            return
+        with self.lock:
+            self.generation += 1
+            shutil.copy2(self.backup_path, self.path)
+            for p in (self.journal_path, self.old_journal_path):
+                if p.exists():
+                    p.unlink()
+
+class SqliteStore:
+    # tasks.db with one row per task and one per dependency edge.
+    # Records become targeted UPDATE/INSERT/DELETE statements in one transaction.
+    name = 'sqlite'
+    supports_records = True
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS tasks (
+        id TEXT PRIMARY KEY,
+        seq INTEGER NOT NULL,
+        title TEXT NOT NULL,
+        desc TEXT NOT NULL,
+        x REAL NOT NULL,
+        y REAL NOT NULL,
+        completed INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE TABLE IF NOT EXISTS deps (
+        task_id TEXT NOT NULL,
+        dep_id TEXT NOT NULL,
+        seq INTEGER NOT NULL,
+        PRIMARY KEY (task_id, dep_id)
+    );
+    CREATE INDEX IF NOT EXISTS deps_by_dep ON deps (dep_id);
+    CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+    """
+
+    def __init__(self, path):
+        self.json_path = path # only read once, for the migration
+        self.path = path.with_suffix(".db")
+        self.backup_path = path.with_suffix(".db.bak")
+        self.lock = threading.Lock()
+        import sqlite3 # only this backend needs it, keep it off the default startup path
+        # saves may come from a worker thread, the lock serializes access
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.executescript(self.SCHEMA)
+        self.migrate_problems = [] # records the import left behind, reported by the next load
+        self._migrate()
+
+    def _migrate(self):
+        # one-time import of the json board the first time the db is opened
+        row = self.conn.execute("SELECT value FROM meta WHERE key='migrated'").fetchone()
+        if row:
+            return
+        # records that cannot load are left behind, tasks.json itself stays as it was
+        data = []
+        problems = self.migrate_problems
+        for i, rec in enumerate(JsonStore(self.json_path).load(problems)):
+            problem = record_problem(rec)
+            if problem is None:
+                data.append(dict({'completed': False, 'dependencies': []}, **rec))
+            else:
+                problems.append(f"record {i}: {problem}")
+        if problems:
+            problems.append(f"{self.json_path.name} is left as it was")
+        with self.lock, self.conn:
+            self._replace_all(data)
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('migrated', '1')")
+
+    def _next_seq(self):
+        row = self.conn.execute("SELECT COALESCE(MAX(seq), -1) + 1 FROM tasks").fetchone()
+        return row[0]
+
+    def _insert_task(self, t, seq):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO tasks (id, seq, title, desc, x, y, completed) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (t['id'], seq, t['title'], t['desc'], t['x'], t['y'], int(t['completed'])))
+        self.conn.execute("DELETE FROM deps WHERE task_id=?", (t['id'],))
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO deps (task_id, dep_id, seq) VALUES (?, ?, ?)",
+            [(t['id'], d, i) for i, d in enumerate(t['dependencies'])])
+
+    def _replace_all(self, task_dicts):
+        self.conn.execute("DELETE FROM tasks")
+        self.conn.execute("DELETE FROM deps")
+        for seq, t in enumerate(task_dicts):
+            self._insert_task(t, seq)
+
+    def load(self, problems=None):
+        # the schema already rules out broken records, only the import can have had some
+        if problems is not None and self.migrate_problems:
+            problems.extend(self.migrate_problems)
+            self.migrate_problems = []
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, title, desc, x, y, completed FROM tasks ORDER BY seq").fetchall()
+            edges = self.conn.execute(
+                "SELECT task_id, dep_id FROM deps ORDER BY task_id, seq").fetchall()
+        task_map = {}
+        for tid, title, desc, x, y, completed in rows:
+            task_map[tid] = {'id': tid, 'title': title, 'desc': desc, 'x': x, 'y': y,
+                             'completed': bool(completed), 'dependencies': []}
+        for tid, dep in edges:
+            if tid in task_map:
+                task_map[tid]['dependencies'].append(dep)
+        return list(task_map.values())
+
+    def write_snapshot(self, task_dicts):
+        with self.lock, self.conn:
+            self._replace_all(task_dicts)
+
+    def append(self, records):
+        if not records:
+            return
+        with self.lock, self.conn:
+            for rec in records:
+                op = rec['op']
+                if op == 'move':
+                    self.conn.execute("UPDATE tasks SET x=?, y=? WHERE id=?", (rec['x'], rec['y'], rec['id']))
+                elif op == 'complete':
+                    self.conn.execute("UPDATE tasks SET completed=? WHERE id=?", (int(rec['completed']), rec['id']))
+                elif op == 'edit':
+                    self.conn.execute("UPDATE tasks SET title=?, desc=? WHERE id=?", (rec['title'], rec['desc'], rec['id']))
+                elif op == 'link':
+                    self.conn.execute(
+                        "INSERT OR IGNORE INTO deps (task_id, dep_id, seq) "
+                        "SELECT ?, ?, COALESCE(MAX(seq), -1) + 1 FROM deps WHERE task_id=?",
+                        (rec['id'], rec['dep'], rec['id']))
+                elif op == 'unlink':
+                    self.conn.execute("DELETE FROM deps WHERE task_id=? AND dep_id=?", (rec['id'], rec['dep']))
+                elif op == 'add':
+                    row = self.conn.execute("SELECT seq FROM tasks WHERE id=?", (rec['task']['id'],)).fetchone()
+                    self._insert_task(rec['task'], row[0] if row else self._next_seq())
+                elif op == 'delete':
+                    self.conn.execute("DELETE FROM tasks WHERE id=?", (rec['id'],))
+                    self.conn.execute("DELETE FROM deps WHERE task_id=? OR dep_id=?", (rec['id'], rec['id']))
+
+    def on_loaded(self, kept_tasks, pruned):
+        if pruned:
+            self.write_snapshot([t.to_dict() for t in kept_tasks])
+
+    def keep_broken_copy(self):
+        return None
+
+    def create_backup(self):
+        import sqlite3
+        with self.lock:
+            dest = sqlite3.connect(str(self.backup_path))
+            try:
+                self.conn.backup(dest)
+            finally:
+                dest.close()
+
+    def restore_backup(self):
+        if not self.backup_path.exists():
+            return
+        import sqlite3
+        with self.lock:
+            src = sqlite3.connect(str(self.backup_path))
+            try:
+                src.backup(self.conn)
+            finally:
+                src.close()
+
+def create_store(backend, path, config):
+    if backend == 'journal':
+        return JournalStore(path, config.JOURNAL_COMPACT_BYTES)
+    if backend == 'sqlite':
+        return SqliteStore(path)
+    return JsonStore(path)
@@ -0,0 +1,80 @@
+from collections import OrderedDict
+from PyQt6.QtCore import Qt, QRect
+from PyQt6.QtGui import QFont, QFontMetrics, QStaticText, QTextOption, QTransform
+from config import UiConfig
+
+class LabelCache:
+    # Shared LRU of label measurements and prepared QStaticText.
+    # Keys are (kind, title, font key, width[, align]); titles are kept in a
+    # side index so an edited title can drop all its entries at once.
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.by_title = {}
+        self.fonts = {}
+        self.hits = 0
+        self.misses = 0
+
+    def font(self, strike=False):
+        # QFont needs a running QGuiApplication, so build them on first use
+        font = self.fonts.get(strike)
+        if font is None:
+            font = QFont(UiConfig.DOT_FONT, UiConfig.DOT_FONT_SIZE)
+            font.setStrikeOut(strike)
+            self.fonts[strike] = font
+        return font
+
+    def _font_key(self, strike):
+        return (UiConfig.DOT_FONT, UiConfig.DOT_FONT_SIZE, strike)
+
+    def _lookup(self, key, build):
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = build()
+        self.entries[key] = value
+        self.by_title.setdefault(key[1], set()).add(key)
+        while len(self.entries) > self.capacity:
+            old_key, _ = self.entries.popitem(last=False)
+            keys = self.by_title.get(old_key[1])
+            if keys is not None:
+                keys.discard(old_key)
+                if not keys:
+                    del self.by_title[old_key[1]]
+        return value
+
+    def measure(self, title, max_w):
+        # word-wrapped bounding rect of the label, as QFontMetrics.boundingRect gives it
+        key = ('rect', title, self._font_key(False), max_w)
+        def build():
+            fm = QFontMetrics(self.font())
+            return fm.boundingRect(QRect(0, 0, max_w, 0), Qt.TextFlag.TextWordWrap, title)
+        return QRect(self._lookup(key, build))
+
+    def static_text(self, title, width, h_align, strike=False):
+        # note: QStaticText draws strike-out across the whole wrap width
+        key = ('static', title, self._font_key(strike), width, int(h_align.value))
+        def build():
+            static = QStaticText(title)
+            static.setTextFormat(Qt.TextFormat.PlainText)
+            static.setTextWidth(width)
+            option = QTextOption(h_align)
+            option.setWrapMode(QTextOption.WrapMode.WordWrap)
+            static.setTextOption(option)
+            static.prepare(QTransform(), self.font(strike))
+            return static
+        return self._lookup(key, build)
+
+    def invalidate(self, title):
+        for key in self.by_title.pop(title, ()):
+            self.entries.pop(key, None)
+
+    def clear(self):
+        self.entries.clear()
+        self.by_title.clear()
+
+label_cache = LabelCache()
@@ -0,0 +1,93 @@
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from config import PerfConfig, get_storage_dir
+
+class Tracer:
+    # Records spans as Chrome trace events ("X" complete events) into a
+    # trace-*.json in the storage dir; open it in Perfetto or chrome://tracing.
+    # Events are buffered and appended in batches, one per line. The json
+    # array is only closed by stop(), which the viewers don't require, so the
+    # trace of a crashed session is still readable.
+    def __init__(self):
+        self.enabled = False
+        self.path = None
+        self.buffer = []
+        self.threads = set() # threads that already got a name event
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+
+    def now(self):
+        # trace timestamps are in microseconds
+        return time.perf_counter_ns() // 1000
+
+    def start(self, path=None):
+        if self.enabled:
+            return self.path
+        if path is None:
+            storage_dir = get_storage_dir()
+            storage_dir.mkdir(parents=True, exist_ok=True)
+            path = storage_dir / time.strftime("trace-%Y%m%d-%H%M%S.json")
+        with open(path, 'w') as f:
+            f.write("[\n")
+        self.path = path
+        self.buffer = []
+        self.threads = set()
+        self.enabled = True
+        return path
+
+    def stop(self):
+        if not self.enabled:
+            return None
+        self.enabled = False
+        end = {'name': "trace stopped", 'ph': 'i', 's': 'g', 'ts': self.now(), 'pid': self.pid, 'tid': 0}
+        with self.lock:
+            self._write(self.buffer, close=end)
+            self.buffer = []
+        return self.path
+
+    def complete(self, name, start, end, args=None):
+        tid = threading.get_ident()
+        event = {'name': name, 'ph': 'X', 'ts': start, 'dur': end - start, 'pid': self.pid, 'tid': tid}
+        if args:
+            event['args'] = args
+        with self.lock:
+            if tid not in self.threads:
+                self.threads.add(tid)
+                self.buffer.append({'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': tid,
+                                    'args': {'name': threading.current_thread().name}})
+            self.buffer.append(event)
+            if len(self.buffer) >= PerfConfig.TRACE_FLUSH_EVENTS:
+                self._write(self.buffer)
+                self.buffer = []
+
+    def _write(self, events, close=None):
+        lines = [json.dumps(e, separators=(',', ':')) + ",\n" for e in events]
+        if close is not None:
+            lines.append(json.dumps(close, separators=(',', ':')) + "\n]\n")
+        try:
+            with open(self.path, 'a') as f:
+                f.writelines(lines)
+        except OSError as e:
+            self.enabled = False
+            print(f"Could not write trace, stopped tracing: {e}", file=sys.stderr)
+
+tracer = Tracer()
+
+def traced(name):
+    # wraps a function in a span; while tracing is off this is one flag check
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            if not tracer.enabled:
+                return fn(*args, **kwargs)
+            start = tracer.now()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                tracer.complete(name, start, tracer.now())
+        return inner
+    return wrap
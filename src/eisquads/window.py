@@ -2,12 +2,13 @@ import json
 import os
 import shutil
 from pathlib import Path
-from PyQt6.QtCore import Qt, QPoint, QPointF, QPropertyAnimation, QEasingCurve, QEvent
-from PyQt6.QtWidgets import QWidget, QHBoxLayout, QVBoxLayout, QApplication, QFileDialog
-from config import UiConfig, STYLESHEET, DockSide, get_storage_dir
+from PyQt6.QtCore import Qt, QPoint, QPointF, QPropertyAnimation, QEasingCurve, QEvent, QTimer
+from PyQt6.QtWidgets import QWidget, QHBoxLayout, QVBoxLayout, QApplication
+from config import UiConfig, StartupConfig, STYLESHEET, DockSide, get_storage_dir
 from tab import DraggableTab
 from matrix import MatrixCanvas
-from models import TaskManager
+from startup import mark
+from tracing import tracer
 
 class SlideWindow(QWidget):
     def __init__(self):
@@ -18,6 +19,8 @@ class SlideWindow(QWidget):
         self.key_buffer = ""
         self.should_save = True
         self.ignore_deactivation = False
+        self.pending_bg = None # fast start: background state read, image not decoded yet
+        self.startup_done = not StartupConfig.FAST_START
 
         self.setWindowFlags(Qt.WindowType.FramelessWindowHint | 
                             Qt.WindowType.WindowStaysOnTopHint | 
@@ -27,6 +30,8 @@ class SlideWindow(QWidget):
         self.anim = QPropertyAnimation(self, b"pos")
         self.anim.setDuration(300)
         self.anim.setEasingCurve(QEasingCurve.Type.OutCubic)
+        self.anim.valueChanged.connect(self.on_slide_frame)
+        self.slide_frame_at = None # trace: when the previous animation frame was shown
 
         # components
         self.tab = DraggableTab()
@@ -50,7 +55,28 @@ class SlideWindow(QWidget):
         
         self.load_state()
         self.snap_to_screen_edge()
-        TaskManager.create_backup()
+        self.content.io.create_backup() # queued after the initial load
+        if not self.startup_done:
+            # the tab shows first, the rest happens once the event loop is idle
+            QTimer.singleShot(StartupConfig.IDLE_BUILD_MS, self.finish_startup)
+
+    def finish_startup(self):
+        # fast start: decode the background and build the board, at most once
+        if self.startup_done:
+            return
+        self.startup_done = True
+        if self.pending_bg is not None:
+            self.apply_background(*self.pending_bg)
+            self.pending_bg = None
+            mark("background decoded")
+        self.content.ensure_board()
+        mark("startup finished")
+
+    def apply_background(self, path, offset, scale, opacity):
+        self.content.set_background(path)
+        self.content.bg_offset = offset
+        self.content.bg_scale = scale
+        self.content.bg_opacity = opacity
 
     def handle_drag_start(self, global_pos):
         # calculate where the mouse is relative to the window top-left
@@ -164,10 +190,12 @@ class SlideWindow(QWidget):
                     # load background state
                     bg_image = data.get("bg_image")
                     if bg_image and os.path.exists(bg_image):
-                        self.content.set_background(bg_image)
-                        self.content.bg_offset = QPointF(data.get("bg_x", 0), data.get("bg_y", 0))
-                        self.content.bg_scale = data.get("bg_scale", 1.0)
-                        self.content.bg_opacity = data.get("bg_opacity", 0.3)
+                        bg = (bg_image, QPointF(data.get("bg_x", 0), data.get("bg_y", 0)),
+                              data.get("bg_scale", 1.0), data.get("bg_opacity", 0.3))
+                        if self.startup_done:
+                            self.apply_background(*bg)
+                        else:
+                            self.pending_bg = bg # decoded in finish_startup
         except Exception:
             pass
 
@@ -202,6 +230,9 @@ class SlideWindow(QWidget):
         if not screen: screen = QApplication.primaryScreen()
         s_geo = screen.geometry()
 
+        if not self.is_expanded:
+            self.finish_startup() # the board has to be there before it slides in
+
         start = self.pos()
         if self.is_expanded:
             end = self.get_hidden_pos(s_geo)
@@ -214,8 +245,18 @@ class SlideWindow(QWidget):
 
         self.anim.setStartValue(start)
         self.anim.setEndValue(end)
+        self.slide_frame_at = None
         self.anim.start()
 
+    def on_slide_frame(self, pos):
+        # trace: one span per animation step, from the previous frame to this one
+        if not tracer.enabled:
+            return
+        now = tracer.now()
+        if self.slide_frame_at is not None:
+            tracer.complete('slide frame', self.slide_frame_at, now, {'expanding': self.is_expanded})
+        self.slide_frame_at = now
+
     def eventFilter(self, obj, event):
         if event.type() == QEvent.Type.WindowDeactivate and self.is_expanded:
             if not self.ignore_deactivation:
@@ -224,6 +265,7 @@ class SlideWindow(QWidget):
         return super().eventFilter(obj, event)
 
     def keyPressEvent(self, event):
+        self.finish_startup() # commands act on the real board
         if event.key() == Qt.Key.Key_Escape:
             QApplication.instance().quit()
             return
@@ -282,15 +324,29 @@ class SlideWindow(QWidget):
             elif self.key_buffer.endswith("redo"):
                 self.content.redo()
                 self.key_buffer = ""
+            elif self.key_buffer.endswith("perf"):
+                self.content.toggle_perf()
+                self.key_buffer = ""
+            elif self.key_buffer.endswith("trace"):
+                if tracer.enabled:
+                    tracer.stop()
+                else:
+                    tracer.start()
+                self.key_buffer = ""
             elif self.key_buffer.endswith("nosave"):
                 self.should_save = False
-                TaskManager.restore_backup()
+                self.content.discard_pending_save()
+                self.content.history.rollback_session()
+                self.content.io.restore_backup()
+                self.content.wait_for_io()
                 QApplication.instance().quit()
             elif self.key_buffer.endswith("recover"):
-                TaskManager.restore_backup()
-                self.content.reload_tasks()
+                self.content.discard_pending_save()
+                self.content.io.restore_backup()
+                self.content.reload_tasks() # loads after the restore, same queue
                 self.key_buffer = ""
             elif self.key_buffer.endswith("bg"):
+                from PyQt6.QtWidgets import QFileDialog
                 self.ignore_deactivation = True
                 file_path, _ = QFileDialog.getOpenFileName(self, "Select Background", "", "Images (*.png *.jpg *.jpeg *.bmp)")
                 self.ignore_deactivation = False
@@ -312,15 +368,20 @@ class SlideWindow(QWidget):
     def closeEvent(self, event):
         # save current position before closing
         if self.should_save:
+            self.content.flush_save()
+            self.content.wait_for_io()
+            c = self.content
+            # a background that was never decoded still keeps its state
+            bg_path, bg_offset, bg_scale, bg_opacity = self.pending_bg or (c.bg_path, c.bg_offset, c.bg_scale, c.bg_opacity)
             try:
                 state = {
                     "x": self.x(), 
                     "y": self.y(),
-                    "bg_image": self.content.bg_path,
-                    "bg_x": int(self.content.bg_offset.x()),
-                    "bg_y": int(self.content.bg_offset.y()),
-                    "bg_scale": self.content.bg_scale,
-                    "bg_opacity": self.content.bg_opacity
+                    "bg_image": bg_path,
+                    "bg_x": int(bg_offset.x()),
+                    "bg_y": int(bg_offset.y()),
+                    "bg_scale": bg_scale,
+                    "bg_opacity": bg_opacity
                 }
                 with open(self.get_state_path(), "w") as f:
                     json.dump(state, f, indent=4)